@@ -9,95 +9,411 @@ v5.1 — Edge TTS iyileştirme:
 """
 
 from __future__ import annotations
-import json, os, random, re, tempfile, asyncio
-from datetime import date, timedelta, datetime
+import json, os, sys, random, re, tempfile, asyncio, threading, atexit, sqlite3, hashlib, time
+import importlib.util, functools, urllib.parse, csv, html, itertools, contextlib, shutil, subprocess, heapq
+import bisect, mmap, struct
+from array import array
+from collections import OrderedDict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from datetime import date, datetime
 from typing import Optional
 
 DATA_FILE = "vocab_en_tr.json"
 USER_DATA = "conversation_data.json"
 INTERVALS = [0, 1, 2, 4, 7, 15, 30]
 
+# ---------- Gecikme ölçümü ----------
+# Sesli akışlardaki her aşama (çeviri, Edge sentezi, mp3 çalma, pyttsx3,
+# mikrofon kalibrasyonu, tanıma) LATENCY.stage(...) ile ölçülür; son
+# LATENCY_SAMPLES örnekten p50/p95, tüm örneklerden sayı/maks tutulur.
+# Yedek arka uca düşüşler LATENCY.event(...) ile sayılır. Menüden
+# görüntülenir, oturum sonunda LATENCY_FILE'a JSON olarak yazılır.
+LATENCY_FILE = "latency_stats.json"   # None: oturum sonunda yazma
+LATENCY_SAMPLES = 2048
+
+class LatencyRecorder:
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = {}    # aşama -> deque (saniye)
+        self.count = Counter()
+        self.worst = {}
+        self.events = Counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t)
+
+    def record(self, name: str, seconds: float):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.max_samples)
+            self.samples[name].append(seconds)
+            self.count[name] += 1
+            self.worst[name] = max(self.worst.get(name, 0.0), seconds)
+
+    def event(self, name: str):
+        with self.lock:
+            self.events[name] += 1
+
+    def summary(self) -> dict:
+        with self.lock:
+            stages = {}
+            for name, dq in self.samples.items():
+                xs = sorted(dq)
+                pct = lambda p: xs[min(len(xs) - 1, int(p * len(xs)))] * 1000
+                stages[name] = {"count": self.count[name], "p50_ms": round(pct(0.50), 1),
+                                "p95_ms": round(pct(0.95), 1), "max_ms": round(self.worst[name] * 1000, 1)}
+            return {"stages": stages, "fallbacks": dict(self.events)}
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear(); self.count.clear(); self.worst.clear(); self.events.clear()
+
+LATENCY = LatencyRecorder()
+
+def show_latency():
+    s = LATENCY.summary()
+    print("\n--- Gecikme (ms) ---")
+    if not s["stages"]:
+        print("Henüz ölçüm yok.")
+    for name, r in sorted(s["stages"].items()):
+        print(f"{name:<22} n={r['count']:<5} p50={r['p50_ms']:>8.1f}  p95={r['p95_ms']:>8.1f}  maks={r['max_ms']:>8.1f}")
+    if s["fallbacks"]:
+        print("Yedeğe düşüşler:", ", ".join(f"{k}: {v}" for k, v in sorted(s["fallbacks"].items())))
+
+def dump_latency(path: Optional[str] = None):
+    path = path or LATENCY_FILE
+    if not path:
+        return
+    out = dict(LATENCY.summary(), written=datetime.now().isoformat(timespec="seconds"))
+    try:
+        _atomic_write_text(path, json.dumps(out, ensure_ascii=False, indent=2))
+    except OSError as e:
+        print(f"(Gecikme istatistikleri yazılamadı: {e})")
+
+# ---------- Ses önbelleği ----------
+# Edge TTS çıktıları (ses, metin, hız) anahtarıyla diske yazılır; tekrar eden
+# kelimeler, B1 soruları ve geri bildirimler ağa gitmeden çalınır. Toplam boyut
+# AUDIO_CACHE_MAX_BYTES'ı aşarsa en uzun süredir kullanılmayan dosyalar silinir.
+AUDIO_CACHE_DIR = "tts_cache"
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+class AudioCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._index = None   # OrderedDict: dosya adı -> boyut (eski -> yeni)
+        self.total = 0
+
+    @staticmethod
+    def key(voice: str, text: str, rate: str) -> str:
+        return hashlib.sha256(f"{voice}\0{rate}\0{text}".encode("utf-8")).hexdigest()
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        for de in os.scandir(self.root):
+            if de.is_file() and de.name.endswith(".mp3"):
+                st = de.stat()
+                entries.append((st.st_mtime, de.name, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self.total = sum(self._index.values())
+
+    def get(self, voice: str, text: str, rate: str = "+0%") -> Optional[str]:
+        name = self.key(voice, text, rate) + ".mp3"
+        with self.lock:
+            self._ensure_index()
+            if name not in self._index:
+                return None
+            path = os.path.join(self.root, name)
+            if not os.path.exists(path):
+                self.total -= self._index.pop(name)
+                return None
+            self._index.move_to_end(name)
+        try:
+            os.utime(path)  # yeniden açılışta LRU sırası korunsun
+        except OSError:
+            pass
+        return path
+
+    def new_tmp(self) -> str:
+        with self.lock:
+            self._ensure_index()
+        fd, tmp = tempfile.mkstemp(prefix=".part-", suffix=".tmp", dir=self.root)
+        os.close(fd)
+        return tmp
+
+    def put(self, tmp: str, voice: str, text: str, rate: str = "+0%") -> str:
+        """Sentezlenmiş geçici dosyayı önbelleğe taşır, kalıcı yolunu döndürür."""
+        name = self.key(voice, text, rate) + ".mp3"
+        path = os.path.join(self.root, name)
+        size = os.path.getsize(tmp)
+        with self.lock:
+            self._ensure_index()
+            os.replace(tmp, path)
+            self.total += size - self._index.pop(name, 0)
+            self._index[name] = size
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: str):
+        while self.total > self.max_bytes and len(self._index) > 1:
+            name, size = next(iter(self._index.items()))
+            if name == keep:
+                break
+            del self._index[name]
+            self.total -= size
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+AUDIO_CACHE = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+
+# ---------- Arka uç önbelleği ----------
+# Açılışta ağ/ses motoru beklememek için arka uçlar ilk kullanımda kurulur.
+# Bulunan Edge sesleri ve pyttsx3 ses kimlikleri BACKEND_CACHE_TTL süresince
+# BACKEND_CACHE_FILE'da saklanır.
+BACKEND_CACHE_FILE = "backend_cache.json"
+BACKEND_CACHE_TTL = 7 * 24 * 3600   # saniye
+
+_backend_cache = None
+_backend_cache_lock = threading.Lock()
+
+def _backend_cache_get(key: str):
+    global _backend_cache
+    with _backend_cache_lock:
+        if _backend_cache is None:
+            try:
+                with open(BACKEND_CACHE_FILE, "r", encoding="utf-8") as f:
+                    _backend_cache = json.load(f)
+            except (OSError, ValueError):
+                _backend_cache = {}
+        entry = _backend_cache.get(key)
+    if not entry or time.time() - entry.get("ts", 0) > BACKEND_CACHE_TTL:
+        return None
+    return entry.get("value")
+
+def _backend_cache_put(key: str, value):
+    _backend_cache_get(key)  # dosyayı yükle
+    with _backend_cache_lock:
+        _backend_cache[key] = {"ts": time.time(), "value": value}
+        try:
+            _atomic_write_text(BACKEND_CACHE_FILE,
+                               json.dumps(_backend_cache, ensure_ascii=False, indent=2))
+        except OSError:
+            pass
+
 # ---------- Edge TTS ----------
-EDGE_OK = False
+EDGE_OK = importlib.util.find_spec("edge_tts") is not None
 EDGE_TR_VOICE = None
 EDGE_EN_VOICE = None
-try:
+_edge_lock = threading.Lock()
+
+async def _pick_edge_voices():
     import edge_tts
-    EDGE_OK = True
+    voices = await edge_tts.list_voices()  # returns list of dicts
+    # Türkçe için uygun ilk voice
+    tr = [v['ShortName'] for v in voices if str(v.get('Locale','')).lower().startswith('tr-')]
+    en = [v['ShortName'] for v in voices if str(v.get('Locale','')).lower().startswith('en-')]
+    return {"tr": tr, "en": en}
 
-    async def _pick_edge_voices():
-        global EDGE_TR_VOICE, EDGE_EN_VOICE
-        try:
-            voices = await edge_tts.list_voices()  # returns list of dicts
-            # Türkçe için uygun ilk voice
-            tr = [v for v in voices if str(v.get('Locale','')).lower().startswith('tr-')]
-            en = [v for v in voices if str(v.get('Locale','')).lower().startswith('en-')]
-            EDGE_TR_VOICE = (tr[0]['ShortName'] if tr else "tr-TR-SedaNeural")
-            EDGE_EN_VOICE = (en[0]['ShortName'] if en else "en-US-AriaNeural")
-        except Exception:
-            EDGE_TR_VOICE = "tr-TR-SedaNeural"
-            EDGE_EN_VOICE = "en-US-AriaNeural"
+def _ensure_edge_voices():
+    global EDGE_TR_VOICE, EDGE_EN_VOICE
+    with _edge_lock:
+        if EDGE_TR_VOICE and EDGE_EN_VOICE:
+            return
+        found = _backend_cache_get("edge_voices")
+        if found is None:
+            try:
+                found = asyncio.run(_pick_edge_voices())
+                _backend_cache_put("edge_voices", found)
+            except Exception:
+                found = {}
+        EDGE_TR_VOICE = (found.get("tr") or ["tr-TR-SedaNeural"])[0]
+        EDGE_EN_VOICE = (found.get("en") or ["en-US-AriaNeural"])[0]
 
-    # pick voices now (synchronously)
+def _play_mp3(path: str):
+    # Önce playsound
+    try:
+        import playsound
+        with LATENCY.stage("play_mp3"):
+            playsound.playsound(path, block=True)
+        return
+    except Exception:
+        LATENCY.event("play:playsound→startfile")
+    # Windows'ta varsayılan oynatıcı
     try:
-        asyncio.run(_pick_edge_voices())
+        os.startfile(path)  # type: ignore[attr-defined]
     except Exception:
-        EDGE_TR_VOICE = "tr-TR-SedaNeural"
-        EDGE_EN_VOICE = "en-US-AriaNeural"
+        LATENCY.event("play:başarısız")
+        print(f"(Ses dosyasını manuel çalabilirsiniz: {path})")
 
-    def _play_mp3(path: str):
-        # Önce playsound
+async def edge_tts_fetch(text: str, voice_candidates, rate: str = "+0%") -> Optional[str]:
+    """Önbellekteki mp3'ü döndürür; yoksa sentezleyip önbelleğe yazar."""
+    voice_candidates = [v for v in voice_candidates if v]
+    for voice in voice_candidates:
+        hit = AUDIO_CACHE.get(voice, text, rate)
+        if hit:
+            LATENCY.event("edge:önbellek")
+            return hit
+    import edge_tts
+    last_err = None
+    for n, voice in enumerate(voice_candidates):
+        fn = AUDIO_CACHE.new_tmp()
         try:
-            import playsound
-            playsound.playsound(path, block=True)
-            return
-        except Exception:
-            pass
-        # Windows'ta varsayılan oynatıcı
+            if n:
+                LATENCY.event("edge:yedek ses")
+            comm = edge_tts.Communicate(text, voice=voice, rate=rate)
+            with LATENCY.stage("edge_synth"):
+                await comm.save(fn)
+            return AUDIO_CACHE.put(fn, voice, text, rate)
+        except Exception as e:
+            last_err = e
+        finally:
+            try:
+                os.remove(fn)
+            except Exception:
+                pass
+    if last_err:
+        print(f"(Edge TTS hatası: {last_err})")
+    return None
+
+# Akışlı çalma: Communicate.stream() parçaları geldikçe stdin'den mp3 okuyabilen
+# bir oynatıcıya (ffplay/mpv/mpg123) aktarılır; ses, sentez bitmeden başlar.
+# Tamamlanan ses yine önbelleğe yazılır. Oynatıcı yoksa, önbellekte varsa ya da
+# ilk parça gelmeden hata olursa kaydet-sonra-çal yoluna düşülür.
+EDGE_STREAM = os.environ.get("EDGE_STREAM", "1") == "1"
+STREAM_PLAYERS = [
+    ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-i", "-"],
+    ["mpv", "--no-terminal", "--no-video", "-"],
+    ["mpg123", "-q", "-"],
+]
+_stream_player = False   # False: henüz aranmadı
+_playback_proc = None    # çalan akış oynatıcısı (kesmek için)
+
+def stream_player() -> Optional[list]:
+    global _stream_player
+    if _stream_player is False:
+        _stream_player = next((cmd for cmd in STREAM_PLAYERS if shutil.which(cmd[0])), None)
+    return _stream_player
+
+async def edge_tts_stream(text: str, voice_candidates, rate: str = "+0%") -> bool:
+    """Sesi akış hâlinde çalar; hiç ses çalınamadıysa False döner."""
+    global _playback_proc
+    voice_candidates = [v for v in voice_candidates if v]
+    cmd = stream_player()
+    if not cmd or any(AUDIO_CACHE.get(v, text, rate) for v in voice_candidates):
+        return False
+    import edge_tts
+    for n, voice in enumerate(voice_candidates):
+        if n:
+            LATENCY.event("edge:yedek ses")
+        comm = edge_tts.Communicate(text, voice=voice, rate=rate)
+        proc, buf, complete = None, bytearray(), False
+        t = time.perf_counter()
         try:
-            os.startfile(path)  # type: ignore[attr-defined]
+            async for chunk in comm.stream():
+                if chunk.get("type") != "audio":
+                    continue
+                if proc is None:
+                    LATENCY.record("edge_first_audio", time.perf_counter() - t)
+                    proc = _playback_proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                buf += chunk["data"]
+                await asyncio.to_thread(proc.stdin.write, chunk["data"])
+            complete = True
+        except BrokenPipeError:
+            pass               # oynatıcı kesildi (interrupt)
         except Exception:
-            print(f"(Ses dosyasını manuel çalabilirsiniz: {path})")
-
-    async def edge_tts_say(text: str, voice_candidates):
-        """voice_candidates bir liste olabilir: sırayla dener"""
-        last_err = None
-        for voice in voice_candidates:
-            fn = tempfile.mktemp(suffix=".mp3")
+            if proc is None:
+                continue       # ses başlamadı: sıradaki ses
+            LATENCY.event("edge:akış yarıda kaldı")
+        if proc is None:
+            continue
+        with LATENCY.stage("play_stream"):
             try:
-                comm = edge_tts.Communicate(text, voice=voice)
-                await comm.save(fn)
-                _play_mp3(fn)
-                return True
-            except Exception as e:
-                last_err = e
+                proc.stdin.close()
+            except OSError:
+                pass
+            await asyncio.to_thread(proc.wait)
+        _playback_proc = None
+        if complete and proc.returncode == 0:   # yarım akış önbelleğe girmesin
+            fn = AUDIO_CACHE.new_tmp()
+            try:
+                with open(fn, "wb") as f:
+                    f.write(buf)
+                AUDIO_CACHE.put(fn, voice, text, rate)
+            except OSError:
+                pass
             finally:
                 try:
                     os.remove(fn)
-                except Exception:
+                except OSError:
                     pass
-        if last_err:
-            print(f"(Edge TTS hatası: {last_err})")
-        return False
+        return True
+    LATENCY.event("edge:akış→kaydet")
+    return False
 
-except Exception:
-    EDGE_OK = False
+async def edge_tts_say(text: str, voice_candidates, rate: str = "+0%"):
+    """voice_candidates bir liste olabilir: sırayla dener"""
+    if EDGE_STREAM:
+        try:
+            if await edge_tts_stream(text, voice_candidates, rate):
+                return True
+        except Exception:
+            LATENCY.event("edge:akış→kaydet")
+    path = await edge_tts_fetch(text, voice_candidates, rate)
+    if not path:
+        return False
+    _play_mp3(path)
+    return True
 
 # ---------- pyttsx3 (yerel) ----------
+# pyttsx3 motoru (SAPI5/COM) onu kuran thread'e bağlıdır; bu yüzden yalnızca
+# konuşma kuyruğunun thread'inde (SPEECH) kurulur ve kullanılır. Başka
+# thread'ler durdurmak için yalnızca _tts_stop'u işaretler; motor bunu kelime
+# başındaki geri çağrıda görüp engine.stop()'u kendi thread'inde çağırır.
 TTS_AVAILABLE = False
 engine = None
-try:
-    import pyttsx3
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 160)
-    TTS_AVAILABLE = True
-except Exception:
-    TTS_AVAILABLE = False
+_tts_tried = False
+_tts_stop = threading.Event()
+
+def _on_tts_word(name, location, length):
+    if _tts_stop.is_set():
+        engine.stop()
+
+def _ensure_tts() -> bool:
+    global TTS_AVAILABLE, engine, _tts_tried
+    if not _tts_tried:
+        _tts_tried = True
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty('rate', 160)
+            engine.connect('started-word', _on_tts_word)
+            TTS_AVAILABLE = True
+        except Exception:
+            TTS_AVAILABLE = False
+    return TTS_AVAILABLE
 
 def detect_voice_id(lang: str) -> Optional[str]:
-    if not TTS_AVAILABLE:
+    if not _ensure_tts():
         return None
     short = "tr" if lang.startswith("tr") else "en"
+    known = _backend_cache_get("pyttsx3_voices") or {}
+    if short in known:
+        return known[short] or None
+    found = None
     try:
         for v in engine.getProperty('voices'):
             name = (getattr(v, 'name', '') or '').lower()
@@ -106,18 +422,20 @@ def detect_voice_id(lang: str) -> Optional[str]:
             haystack = " ".join([name, vid, langs])
             if short == "tr":
                 if any(k in haystack for k in ["tr-tr", "tr_tr", " turkish", " turk", "tts_turkish", "tr_"]):
-                    return v.id
+                    found = v.id; break
             else:
                 if any(k in haystack for k in ["en-us", "en_gb", "english", "en_"]):
-                    return v.id
+                    found = v.id; break
     except Exception:
-        pass
-    return None
+        return None
+    known[short] = found or ""
+    _backend_cache_put("pyttsx3_voices", known)
+    return found
 
 _voice_cache = {"tr": None, "en": None}
 
 def set_pyttsx3_voice(lang: str) -> bool:
-    if not TTS_AVAILABLE:
+    if not _ensure_tts():
         return False
     short = "tr" if lang.startswith("tr") else "en"
     vid = _voice_cache.get(short) or detect_voice_id(short)
@@ -130,65 +448,440 @@ def set_pyttsx3_voice(lang: str) -> bool:
     except Exception:
         return False
 
-def speak(text: str, lang: str = "en"):
+def _edge_voices(short: str) -> list:
+    _ensure_edge_voices()
+    return [EDGE_TR_VOICE, "tr-TR-AhmetNeural", "tr-TR-SedaNeural"] if short=="tr" else \
+           [EDGE_EN_VOICE, "en-US-AriaNeural", "en-GB-LibbyNeural"]
+
+def _uses_edge_now(lang: str) -> bool:
+    short = "tr" if lang.startswith("tr") else "en"
+    return EDGE_OK and not (_ensure_tts() and (_voice_cache.get(short) or detect_voice_id(short)))
+
+def speech_uses_edge(lang: str) -> bool:
+    """speak() bu dil için Edge TTS'e mi düşecek? (yerel ses yoksa)"""
+    return SPEECH.call(_uses_edge_now, lang)
+
+def _speak_now(text: str, lang: str = "en"):
     short = "tr" if lang.startswith("tr") else "en"
     # 1) yerel ses
-    if TTS_AVAILABLE and set_pyttsx3_voice(lang):
+    if _ensure_tts() and set_pyttsx3_voice(lang):
         try:
-            engine.say(text)
-            engine.runAndWait()
+            with LATENCY.stage("pyttsx3"):
+                _tts_stop.clear()
+                engine.say(text)
+                engine.runAndWait()
             return
         except Exception:
             pass
     # 2) edge-tts
     if EDGE_OK:
-        voices = [EDGE_TR_VOICE, "tr-TR-AhmetNeural", "tr-TR-SedaNeural"] if short=="tr" else \
-                 [EDGE_EN_VOICE, "en-US-AriaNeural", "en-GB-LibbyNeural"]
+        LATENCY.event("tts:pyttsx3→edge")
         try:
-            asyncio.run(edge_tts_say(text, voices))
+            asyncio.run(edge_tts_say(text, _edge_voices(short)))
             return
         except Exception as e:
             print(f"(Edge TTS çalışmadı: {e})")
+    LATENCY.event("tts:sessiz")
     print("(Uyarı: TTS çalıştırılamadı.)")
 
+# ---------- Konuşma kuyruğu ----------
+# speak() sesi tek bir arka plan thread'inin kuyruğuna koyar ve hemen döner;
+# ekrana yazma, seçeneklerin listelenmesi ve dinleme ses çalarken sürer.
+# Küçük öncelik önce çalar (eşitlerde geliş sırası). Her söyleyişin bir
+# Future'ı vardır; interrupt() bekleyenleri iptal edip çalanı keser.
+SPEAK_URGENT, SPEAK_NORMAL, SPEAK_LOW = 0, 1, 2
+
+class SpeechQueue:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.heap = []           # (öncelik, sıra, söyleyiş mi, Future, fn, args)
+        self.seq = itertools.count()
+        self.thread = None
+        self.busy = False
+
+    def submit(self, priority: int, fn, *args, speech: bool = False) -> Future:
+        fut = Future()
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="speech", daemon=True)
+                self.thread.start()
+            heapq.heappush(self.heap, (priority, next(self.seq), speech, fut, fn, args))
+            self.cond.notify_all()
+        return fut
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.heap:
+                    self.cond.wait()
+                _, _, _, fut, fn, args = heapq.heappop(self.heap)
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                self.busy = True
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def say(self, text: str, lang: str, priority: int = SPEAK_NORMAL) -> Future:
+        return self.submit(priority, _speak_now, text, lang, speech=True)
+
+    def call(self, fn, *args):
+        """fn'i konuşma thread'inde çalıştırıp sonucunu bekler (pyttsx3 erişimi için)."""
+        if threading.current_thread() is self.thread:
+            return fn(*args)
+        return self.submit(SPEAK_URGENT, fn, *args).result()
+
+    def cancel_pending(self):
+        with self.cond:
+            keep = []
+            for item in self.heap:
+                if item[2]:
+                    item[3].cancel()
+                else:
+                    keep.append(item)
+            heapq.heapify(keep)
+            self.heap = keep
+            self.cond.notify_all()
+
+    def interrupt(self):
+        """Kullanıcı cevaplamaya başladı: bekleyenleri iptal et, çalanı kes."""
+        self.cancel_pending()
+        if self.busy:
+            _stop_playback()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.heap and not self.busy, timeout)
+
+def _stop_playback():
+    proc = _playback_proc
+    if proc is not None:
+        try:
+            proc.terminate()
+        except OSError:
+            pass
+    if engine is not None:
+        _tts_stop.set()   # engine.stop() konuşma thread'inde çağrılır
+
+SPEECH = SpeechQueue()
+
+def speak(text: str, lang: str = "en", priority: int = SPEAK_NORMAL, wait: bool = False) -> Future:
+    """Sesi kuyruğa koyar; wait=True ise çalması bitene kadar bekler."""
+    fut = SPEECH.say(text, lang, priority)
+    if wait:
+        try:
+            fut.result()
+        except Exception:
+            pass
+    return fut
+
 # ---------- STT ----------
+# Mikrofon bir oturum boyunca (sesli çalışma / konuşma) açık tutulur;
+# ortam gürültüsü kalibrasyonu oturum başında bir kez yapılır ve
+# STT_RECALIBRATE_SECS'te bir tazelenir. prelisten() ile soru okunurken
+# arka planda dinlemeye başlanabilir (STT_BARGE_IN=1).
+# Tanıyıcılar dile göre seçilir: STT_EN / STT_TR ortam değişkenleri virgülle
+# ayrılmış arka uç listesidir ("vosk,google" = önce çevrimdışı, olmazsa ağ).
+STT_RECALIBRATE_SECS = 120.0
+STT_CALIBRATE_SECS = 0.5
+STT_BARGE_IN = os.environ.get("STT_BARGE_IN", "0") == "1"
+STT_BACKENDS = {
+    "en-US": os.environ.get("STT_EN", "google"),
+    "tr-TR": os.environ.get("STT_TR", "google"),
+}
+VOSK_MODELS = {
+    "en-US": os.environ.get("VOSK_MODEL_EN", "vosk-model-small-en-us-0.15"),
+    "tr-TR": os.environ.get("VOSK_MODEL_TR", "vosk-model-small-tr-0.3"),
+}
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+_WHISPER_LANGS = {"en-US": "english", "tr-TR": "turkish"}
+
 STT_AVAILABLE = False
-try:
-    import speech_recognition as sr
-    recognizer = sr.Recognizer()
-    STT_AVAILABLE = True
-except Exception:
-    STT_AVAILABLE = False
+sr = None
+recognizer = None
+_stt_lock = threading.Lock()
+_stt_tried = False
+
+def _ensure_stt() -> bool:
+    global STT_AVAILABLE, sr, recognizer, _stt_tried
+    with _stt_lock:
+        if not _stt_tried:
+            _stt_tried = True
+            try:
+                import speech_recognition
+                sr = speech_recognition
+                recognizer = sr.Recognizer()
+                STT_AVAILABLE = True
+            except Exception:
+                STT_AVAILABLE = False
+    return STT_AVAILABLE
+
+def _rec_google(audio, lang: str) -> str:
+    return recognizer.recognize_google(audio, language=lang)
+
+def _rec_sphinx(audio, lang: str) -> str:
+    return recognizer.recognize_sphinx(audio, language=lang)
+
+def _rec_whisper(audio, lang: str) -> str:
+    return recognizer.recognize_whisper(audio, model=WHISPER_MODEL, language=_WHISPER_LANGS.get(lang, "english"))
+
+_vosk_models = {}
+
+def _rec_vosk(audio, lang: str) -> str:
+    import vosk
+    with _stt_lock:
+        model = _vosk_models.get(lang)
+        if model is None:
+            model = _vosk_models[lang] = vosk.Model(VOSK_MODELS[lang])
+    rec = vosk.KaldiRecognizer(model, 16000)
+    rec.AcceptWaveform(audio.get_raw_data(convert_rate=16000, convert_width=2))
+    text = json.loads(rec.FinalResult()).get("text", "")
+    if not text:
+        raise ValueError("vosk: boş sonuç")
+    return text
+
+STT_RECOGNIZERS = {"google": _rec_google, "sphinx": _rec_sphinx,
+                   "whisper": _rec_whisper, "vosk": _rec_vosk}
+
+def register_recognizer(name: str, fn):
+    """fn(audio, lang) -> metin; STT_EN/STT_TR içinde adıyla seçilir."""
+    STT_RECOGNIZERS[name] = fn
+
+def recognize(audio, lang: str) -> str:
+    names = [n.strip() for n in STT_BACKENDS.get(lang, "google").split(",") if n.strip()]
+    err = None
+    for name in names:
+        try:
+            with LATENCY.stage(f"stt_recognize_{name}"):
+                return STT_RECOGNIZERS[name](audio, lang)
+        except Exception as e:
+            err = e
+            LATENCY.event(f"stt:{name} başarısız")
+    raise err or ValueError("tanıyıcı yok")
+
+class MicSession:
+    """Açık tutulan mikrofon kaynağı + kalibrasyon + arka planda yakalama."""
+    def __init__(self):
+        self.mic = None
+        self.source = None
+        self.calibrated = 0.0
+        self.lock = threading.Lock()
+        self.pending = None      # (Future, timeout, phrase_time_limit)
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mic")
+
+    def open(self):
+        self.mic = sr.Microphone()
+        self.source = self.mic.__enter__()
+        self.calibrate(force=True)
+
+    def close(self):
+        if self.pending is not None:
+            try:
+                self.pending[0].result()
+            except Exception:
+                pass
+            self.pending = None
+        self.pool.shutdown(wait=True)
+        if self.mic is not None:
+            self.mic.__exit__(None, None, None)
+            self.mic = self.source = None
+
+    def calibrate(self, force: bool = False):
+        if not force and time.monotonic() - self.calibrated < STT_RECALIBRATE_SECS:
+            return
+        with self.lock, LATENCY.stage("stt_calibrate"):
+            recognizer.adjust_for_ambient_noise(self.source, duration=STT_CALIBRATE_SECS)
+        self.calibrated = time.monotonic()
+
+    def _capture(self, timeout, phrase_time_limit):
+        with self.lock, LATENCY.stage("stt_capture"):
+            return recognizer.listen(self.source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+
+    def begin(self, timeout: float, phrase_time_limit: float):
+        """Yakalamayı arka planda başlatır (ör. soru okunurken)."""
+        if self.pending is None:
+            self.calibrate()
+            fut = self.pool.submit(self._capture, timeout, phrase_time_limit)
+            self.pending = (fut, timeout, phrase_time_limit)
+
+    def capture(self, timeout: float, phrase_time_limit: float):
+        if self.pending is not None:
+            fut = self.pending[0]; self.pending = None
+            return fut.result()
+        self.calibrate()
+        return self._capture(timeout, phrase_time_limit)
+
+_mic = None   # etkin MicSession
+
+@contextlib.contextmanager
+def mic_session():
+    """Sesli çalışma/konuşma süresince mikrofonu açık tutar."""
+    global _mic
+    if _mic is not None or not _ensure_stt():
+        yield _mic; return
+    session = MicSession()
+    try:
+        session.open()
+    except Exception as e:
+        print(f"(Mikrofon açılamadı: {e})")
+        yield None; return
+    _mic = session
+    try:
+        yield session
+    finally:
+        _mic = None
+        session.close()
+
+def prelisten(timeout: float = 6.0, phrase_time_limit: float = 45.0):
+    """STT_BARGE_IN açıksa, sonraki listen() için yakalamayı şimdiden başlatır."""
+    if STT_BARGE_IN and _mic is not None:
+        _mic.begin(timeout, phrase_time_limit)
 
 def listen(lang: str = "en-US", timeout: float = 6.0, phrase_time_limit: float = 45.0) -> Optional[str]:
-    if not STT_AVAILABLE:
+    if not _ensure_stt():
         return None
     try:
-        with sr.Microphone() as source:
-            print("🎙️ Dinliyorum... (maks 45 sn)")
-            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-        text = recognizer.recognize_google(audio, language=lang)
+        if not (STT_BARGE_IN and _mic is not None and _mic.pending is not None):
+            SPEECH.wait_idle()   # hoparlör sesi mikrofona girmesin
+        print(f"🎙️ Dinliyorum... (maks {phrase_time_limit:g} sn)")
+        if _mic is not None:
+            audio = _mic.capture(timeout, phrase_time_limit)
+        else:
+            with sr.Microphone() as source:
+                with LATENCY.stage("stt_calibrate"):
+                    recognizer.adjust_for_ambient_noise(source, duration=STT_CALIBRATE_SECS)
+                with LATENCY.stage("stt_capture"):
+                    audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+        SPEECH.interrupt()
+        text = recognize(audio, lang)
         print("📝 Algılanan:", text)
         return text
     except Exception as e:
+        LATENCY.event("stt:başarısız→yazılı")
         print(f"(Ses algılanamadı: {e})")
         return None
 
+def warm_backends():
+    """Ağ gerektiren/yavaş içe aktarımları arka planda ısıtır (pyttsx3 hariç)."""
+    def work():
+        if EDGE_OK:
+            _ensure_edge_voices()
+        _ensure_stt()
+    threading.Thread(target=work, name="warm-backends", daemon=True).start()
+
 # ---------- Çeviri ----------
-def translate_text(text: str, dest: str = "tr") -> str:
-    try:
+# translate_text önce bellek içi LRU'ya, sonra TRANSLATION_CACHE_FILE (SQLite)
+# içindeki kalıcı tabloya bakar; yalnızca ıskalamada ağa gider. Çevirmen
+# istemcileri bir kez kurulup yeniden kullanılır. Hatalı çeviriler saklanmaz.
+TRANSLATION_CACHE_FILE = "translations.db"
+TRANSLATION_MEMORY_SIZE = 4096
+
+class TranslationCache:
+    def __init__(self, path: str, mem_size: int):
+        self.path = path
+        self.mem_size = mem_size
+        self.mem = OrderedDict()   # (dest, text) -> çeviri
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def _db(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS translations ("
+                              "dest TEXT NOT NULL, text TEXT NOT NULL, result TEXT NOT NULL, "
+                              "PRIMARY KEY (dest, text))")
+        return self.conn
+
+    def _remember(self, key, value):
+        self.mem[key] = value
+        self.mem.move_to_end(key)
+        while len(self.mem) > self.mem_size:
+            self.mem.popitem(last=False)
+
+    def get(self, text: str, dest: str) -> Optional[str]:
+        key = (dest, text)
+        with self.lock:
+            if key in self.mem:
+                self.mem.move_to_end(key)
+                return self.mem[key]
+            try:
+                row = self._db().execute("SELECT result FROM translations WHERE dest=? AND text=?",
+                                         key).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def put_many(self, dest: str, pairs):
+        with self.lock:
+            for text, result in pairs:
+                self._remember((dest, text), result)
+            try:
+                with self._db() as conn:
+                    conn.executemany("INSERT OR REPLACE INTO translations(dest, text, result) "
+                                     "VALUES (?, ?, ?)", [(dest, t, r) for t, r in pairs])
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close(); self.conn = None
+
+TRANSLATIONS = TranslationCache(TRANSLATION_CACHE_FILE, TRANSLATION_MEMORY_SIZE)
+atexit.register(TRANSLATIONS.close)
+
+_translators = {}               # "google" / ("deep", dest) -> istemci
+_translator_lock = threading.Lock()
+
+def _google_translator():
+    if "google" not in _translators:
         from googletrans import Translator
-        tr = Translator()
-        res = tr.translate(text, dest=dest)
-        return res.text
-    except Exception:
-        pass
-    try:
+        _translators["google"] = Translator()
+    return _translators["google"]
+
+def _deep_translator(dest: str):
+    if ("deep", dest) not in _translators:
         from deep_translator import GoogleTranslator
-        return GoogleTranslator(source="auto", target=dest).translate(text)
-    except Exception as e:
-        return f"(Çeviri yapılamadı: {e})"
+        _translators[("deep", dest)] = GoogleTranslator(source="auto", target=dest)
+    return _translators[("deep", dest)]
+
+def _translate_remote(texts: list, dest: str) -> list:
+    """Iskalanan metinleri tek istekte çevirir; başarısızsa istisna fırlatır."""
+    with _translator_lock:
+        try:
+            with LATENCY.stage("translate_remote"):
+                res = _google_translator().translate(texts, dest=dest)
+            return [r.text for r in res]
+        except Exception:
+            LATENCY.event("translate:googletrans→deep_translator")
+        with LATENCY.stage("translate_remote"):
+            return _deep_translator(dest).translate_batch(texts)
+
+def translate_many(texts, dest: str = "tr") -> list:
+    out = [TRANSLATIONS.get(t, dest) for t in texts]
+    misses = list(dict.fromkeys(t for t, hit in zip(texts, out) if hit is None))
+    if misses:
+        err = "(Çeviri yapılamadı: boş yanıt)"
+        try:
+            results = _translate_remote(misses, dest)
+        except Exception as e:
+            results, err = [], f"(Çeviri yapılamadı: {e})"
+        found = {t: r for t, r in zip(misses, results) if r}
+        TRANSLATIONS.put_many(dest, list(found.items()))
+        out = [r if r is not None else found.get(t, err) for t, r in zip(texts, out)]
+    return out
+
+def translate_text(text: str, dest: str = "tr") -> str:
+    with LATENCY.stage("translate_text"):
+        return translate_many([text], dest)[0]
 
 def extract_translate_query(text: str) -> Optional[str]:
     t = text.strip()
@@ -200,77 +893,1260 @@ def extract_translate_query(text: str) -> Optional[str]:
     if m: return m.group(1).strip()
     return None
 
-# ---------- Sözlük / veri ----------
-B1_DEFAULTS = [
-    ("achieve", "başarmak;erişmek"), ("afford", "gücü yetmek"), ("allow", "izin vermek"),
-    ("although", "olmasına rağmen"), ("announce", "duyurmak;ilan etmek"),
-    ("apply", "başvurmak;uygulamak"), ("arrange", "düzenlemek;ayarlamak"),
-    ("attend", "katılmak;devam etmek"), ("avoid", "kaçınmak"), ("compare", "karşılaştırmak"),
-    ("complain", "şikayet etmek"), ("consider", "düşünmek;göz önünde bulundurmak"),
-    ("contain", "içermek"), ("continue", "devam etmek"), ("contribute", "katkıda bulunmak"),
-    ("decision", "karar"), ("decrease", "azalmak;azaltmak"), ("deliver", "teslim etmek"),
-    ("depend", "bağlı olmak"), ("describe", "tanımlamak;betimlemek"), ("develop", "geliştirmek"),
-    ("efficient", "verimli"), ("environment", "çevre"), ("experience", "deneyim"),
-    ("explain", "açıklamak"), ("improve", "iyileştirmek"), ("include", "içermek"),
-    ("increase", "artmak;artırmak"), ("introduce", "tanıtmak;tanıştırmak"),
-    ("involve", "içermek;dahil etmek"), ("manage", "yönetmek;başarmak"),
-    ("organize", "düzenlemek"), ("participate", "katılmak"), ("perform", "sergilemek"),
-    ("prefer", "tercih etmek"), ("produce", "üretmek"), ("promise", "söz vermek"),
-    ("protect", "korumak"), ("purpose", "amaç"), ("quality", "kalite"),
-    ("reduce", "azaltmak"), ("relationship", "ilişki"), ("remove", "kaldırmak"),
-    ("reply", "yanıtlamak;yanıt"), ("require", "gerektirmek;istemek"),
-    ("respect", "saygı göstermek;saygı"), ("result", "sonuç"), ("rule", "kural;yönetmek"),
-    ("satisfy", "tatmin etmek"), ("solution", "çözüm"), ("support", "destek;desteklemek"),
-    ("tradition", "gelenek"), ("transport", "taşımak;ulaştırma"), ("various", "çeşitli"),
-    ("willing", "istekli")
-]
+# ---------- Sözlük / veri ----------
+B1_DEFAULTS = [
+    ("achieve", "başarmak;erişmek"), ("afford", "gücü yetmek"), ("allow", "izin vermek"),
+    ("although", "olmasına rağmen"), ("announce", "duyurmak;ilan etmek"),
+    ("apply", "başvurmak;uygulamak"), ("arrange", "düzenlemek;ayarlamak"),
+    ("attend", "katılmak;devam etmek"), ("avoid", "kaçınmak"), ("compare", "karşılaştırmak"),
+    ("complain", "şikayet etmek"), ("consider", "düşünmek;göz önünde bulundurmak"),
+    ("contain", "içermek"), ("continue", "devam etmek"), ("contribute", "katkıda bulunmak"),
+    ("decision", "karar"), ("decrease", "azalmak;azaltmak"), ("deliver", "teslim etmek"),
+    ("depend", "bağlı olmak"), ("describe", "tanımlamak;betimlemek"), ("develop", "geliştirmek"),
+    ("efficient", "verimli"), ("environment", "çevre"), ("experience", "deneyim"),
+    ("explain", "açıklamak"), ("improve", "iyileştirmek"), ("include", "içermek"),
+    ("increase", "artmak;artırmak"), ("introduce", "tanıtmak;tanıştırmak"),
+    ("involve", "içermek;dahil etmek"), ("manage", "yönetmek;başarmak"),
+    ("organize", "düzenlemek"), ("participate", "katılmak"), ("perform", "sergilemek"),
+    ("prefer", "tercih etmek"), ("produce", "üretmek"), ("promise", "söz vermek"),
+    ("protect", "korumak"), ("purpose", "amaç"), ("quality", "kalite"),
+    ("reduce", "azaltmak"), ("relationship", "ilişki"), ("remove", "kaldırmak"),
+    ("reply", "yanıtlamak;yanıt"), ("require", "gerektirmek;istemek"),
+    ("respect", "saygı göstermek;saygı"), ("result", "sonuç"), ("rule", "kural;yönetmek"),
+    ("satisfy", "tatmin etmek"), ("solution", "çözüm"), ("support", "destek;desteklemek"),
+    ("tradition", "gelenek"), ("transport", "taşımak;ulaştırma"), ("various", "çeşitli"),
+    ("willing", "istekli")
+]
+
+def new_card(en: str, tr: str, today: Optional[str] = None) -> dict:
+    return {"en": en, "tr": tr, "box": 0, "next": today or date.today().isoformat(),
+            "stats": {"correct": 0, "wrong": 0}}
+
+# ---------- Sütunlu deste (büyük desteler) ----------
+# COLUMNAR_MIN_BYTES'tan büyük JSON desteleri kart başına bir dict yerine
+# sütunlarda tutulur: kutu array('b'), sonraki tarih gün sırası (ordinal)
+# olarak array('i'), doğru/yanlış sayaçları array('I'), metinler intern
+# edilmiş listeler. Kartlara CardView ile erişilir; card["box"],
+# card["next"], card["stats"]["correct"] += 1 gibi ifadeler aynen çalışır.
+# due_cards/reset/istatistik sütunlar üzerinde C hızında döngülerle yapılır;
+# oturumların due kuyruğu kovalarını doğrudan "next" dizisinden kurar.
+# Dosya biçimi değişmez (girintili JSON).
+COLUMNAR_MIN_BYTES = 4 * 1024 * 1024   # None: hiçbir zaman
+
+@functools.lru_cache(maxsize=4096)
+def _iso_of(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+@functools.lru_cache(maxsize=4096)
+def _ordinal_of(iso: str) -> int:
+    return date.fromisoformat(iso).toordinal()
+
+_CARD_KEYS = ("en", "tr", "box", "next", "stats")
+
+class StatsView:
+    __slots__ = ("deck", "pos")
+
+    def __init__(self, deck, pos):
+        self.deck = deck; self.pos = pos
+
+    def __getitem__(self, key):
+        if key == "correct":
+            return self.deck.correct[self.pos]
+        if key == "wrong":
+            return self.deck.wrong[self.pos]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "correct":
+            self.deck.correct[self.pos] = value
+        elif key == "wrong":
+            self.deck.wrong[self.pos] = value
+        else:
+            raise KeyError(key)
+
+    def keys(self):
+        return ("correct", "wrong")
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class CardView:
+    """ColumnarDeck içindeki bir kartın dict benzeri görünümü.
+    Kimlik yerine (deste, sıra) ile karşılaştırılır."""
+    __slots__ = ("deck", "pos")
+
+    def __init__(self, deck, pos):
+        self.deck = deck; self.pos = pos
+
+    def __getitem__(self, key):
+        d, i = self.deck, self.pos
+        if key == "en":
+            return d.en[i]
+        if key == "tr":
+            return d.tr[i]
+        if key == "box":
+            return d.box[i]
+        if key == "next":
+            return _iso_of(d.next[i])
+        if key == "stats":
+            return StatsView(d, i)
+        return d.extra.get(i, {})[key]
+
+    def __setitem__(self, key, value):
+        d, i = self.deck, self.pos
+        if key == "en":
+            d.en[i] = sys.intern(value)
+        elif key == "tr":
+            d.tr[i] = sys.intern(value)
+        elif key == "box":
+            d.box[i] = value
+        elif key == "next":
+            d.next[i] = _ordinal_of(value)
+        elif key == "stats":
+            d.correct[i] = value.get("correct", 0); d.wrong[i] = value.get("wrong", 0)
+        else:
+            d.extra.setdefault(i, {})[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return _CARD_KEYS + tuple(self.deck.extra.get(self.pos, ()))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self) -> dict:
+        d = {k: self[k] for k in _CARD_KEYS}
+        d["stats"] = dict(d["stats"])
+        d.update(self.deck.extra.get(self.pos, {}))
+        return d
+
+    def __eq__(self, other):
+        return isinstance(other, CardView) and other.deck is self.deck and other.pos == self.pos
+
+    def __hash__(self):
+        return hash((id(self.deck), self.pos))
+
+    def __repr__(self):
+        return f"CardView({self.to_dict()!r})"
+
+class ColumnarDeck:
+    def __init__(self):
+        self.en, self.tr = [], []
+        self.box = array("b")
+        self.next = array("i")
+        self.correct = array("I")
+        self.wrong = array("I")
+        self.extra = {}   # sıra -> bilinmeyen alanlar (seyrek)
+
+    def __len__(self):
+        return len(self.en)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [CardView(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return CardView(self, i)
+
+    def __iter__(self):
+        return (CardView(self, i) for i in range(len(self)))
+
+    def append(self, card):
+        if isinstance(card, CardView):
+            card = card.to_dict()
+        st = card.get("stats") or {}
+        self.en.append(sys.intern(card["en"])); self.tr.append(sys.intern(card["tr"]))
+        self.box.append(card.get("box", 0))
+        self.next.append(_ordinal_of(card["next"]) if card.get("next") else date.today().toordinal())
+        self.correct.append(st.get("correct", 0)); self.wrong.append(st.get("wrong", 0))
+        extra = {k: v for k, v in card.items() if k not in _CARD_KEYS}
+        if extra:
+            self.extra[len(self.en) - 1] = extra
+
+    def due_positions(self, today: str):
+        # t >= next  <=>  next <= t ; map/compress C içinde döner
+        return itertools.compress(range(len(self.next)), map(_ordinal_of(today).__ge__, self.next))
+
+    def due(self, today: str) -> list:
+        return list(map(functools.partial(CardView, self), self.due_positions(today)))
+
+    def reset(self, today: str):
+        n = len(self)
+        self.box = array("b", bytes(n))
+        self.next = array("i", [_ordinal_of(today)]) * n
+        self.correct = array("I", [0]) * n
+        self.wrong = array("I", [0]) * n
+
+    def iter_json(self):
+        """Kartları json.dump(indent=2) ile aynı biçimde, tek tek metne çevirir."""
+        dumps = json.dumps
+        for i in range(len(self)):
+            text = ('    {\n      "en": %s,\n      "tr": %s,\n      "box": %d,\n      "next": "%s",\n'
+                    '      "stats": {\n        "correct": %d,\n        "wrong": %d\n      }'
+                    % (dumps(self.en[i], ensure_ascii=False), dumps(self.tr[i], ensure_ascii=False),
+                       self.box[i], _iso_of(self.next[i]), self.correct[i], self.wrong[i]))
+            for k, v in self.extra.get(i, {}).items():
+                val = dumps(v, ensure_ascii=False, indent=2).replace("\n", "\n      ")
+                text += f',\n      {dumps(k, ensure_ascii=False)}: {val}'
+            yield text + "\n    }"
+
+    def copy(self) -> "ColumnarDeck":
+        """Arka plan yazımı için anlık kopya; diziler kopyalanır, metinler paylaşılır."""
+        c = ColumnarDeck()
+        c.en, c.tr = (s.frozen() if isinstance(s, MappedStrings) else s[:] for s in (self.en, self.tr))
+        c.box, c.next = self.box[:], self.next[:]
+        c.correct, c.wrong = self.correct[:], self.wrong[:]
+        c.extra = {i: dict(v) for i, v in self.extra.items()}
+        return c
+
+    def close(self):
+        """İkili snapshot'tan açıldıysa eşlemeyi bırakır."""
+        for s in (self.en, self.tr):
+            if isinstance(s, MappedStrings):
+                s.close()
+
+    @classmethod
+    def load_json(cls, f) -> dict:
+        """json.load ile okur; kart dict'leri oluştukça sütunlara aktarılır,
+        böylece bütün deste aynı anda dict olarak bellekte durmaz."""
+        deck = cls()
+
+        def hook(obj):
+            if "en" in obj and "tr" in obj:
+                deck.append(obj)
+                return None
+            return obj
+
+        data = json.load(f, object_hook=hook)
+        data["cards"] = deck
+        return data
+
+def _deck_copy(data) -> dict:
+    """Snapshot için ucuz kopya (st.lock altında); metne çevirme arka planda yapılır."""
+    cards = data["cards"]
+    if isinstance(cards, ColumnarDeck):
+        cards = cards.copy()
+    else:
+        cards = [dict(c, stats=dict(c["stats"])) for c in cards]
+    return dict(data, cards=cards)
+
+def _deck_json_text(data, seq: int, agg: Optional[dict] = None) -> str:
+    cards = data["cards"]
+    extra = {"seq": seq} if agg is None else {"seq": seq, "agg": agg}
+    if not isinstance(cards, ColumnarDeck):
+        return json.dumps(dict(data, **extra), ensure_ascii=False, indent=2)
+    rest = {k: v for k, v in data.items() if k != "cards"}
+    rest.update(extra)
+    tail = json.dumps(rest, ensure_ascii=False, indent=2)   # '{\n  "seq": ...\n}'
+    body = ",\n".join(cards.iter_json())
+    head = '{\n  "cards": [\n' + body + '\n  ],\n' if body else '{\n  "cards": [],\n'
+    return head + tail[2:]
+
+# ---------- İkili snapshot (mmap) ----------
+# Sütunlu destelerde JSON snapshot'ın yanına BINARY_SUFFIX uzantılı ikili bir
+# kopya yazılır: sabit genişlikli SRS sütunları (kutu, sonraki gün, doğru,
+# yanlış), UTF-8 metin bloğu ve metin başına ofset tablosu. Açılışta dosya
+# mmap ile eşlenir; sayısal sütunlar tek kopyayla dizilere alınır, en/tr
+# metinleri ancak okunduklarında çözülür. Başlıkta JSON'un boyutu ve mtime'ı
+# durur; JSON sonradan (elle) değişmişse ikili kopya yok sayılır ve yeniden
+# üretilir. Windows'ta eşlenmiş dosyanın üzerine yazılamadığından yeni kopya
+# ".new" olarak bırakılır, sonraki açılışta yerine taşınır.
+BINARY_SNAPSHOT = True
+BINARY_SUFFIX = ".bin"
+_BIN_MAGIC = b"SRSDECK1"
+# magic, n, seq, JSON mtime_ns, JSON boyutu, ofset tablosu, meta, meta uzunluğu
+_BIN_HEADER = struct.Struct("<8sQQqQQQQ")
+_BIN_COLUMNS = (("box", "b"), ("next", "i"), ("correct", "I"), ("wrong", "I"))
+_BIN_OK = sys.byteorder == "little" and array("i").itemsize == array("I").itemsize == 4
+
+def _bin_starts(n: int) -> list:
+    """Sütunların ve metin bloğunun dosyadaki başlangıçları (8 bayta hizalı)."""
+    pos, out = _BIN_HEADER.size, []
+    for _, code in _BIN_COLUMNS:
+        out.append(pos)
+        pos = (pos + array(code).itemsize * n + 7) & ~7
+    out.append(pos)
+    return out
+
+class MappedStrings:
+    """mmap'teki metin bloğu üzerinde liste görünümü (en: parity 0, tr: 1).
+    Değiştirilen ve sonradan eklenen metinler bellekte tutulur."""
+    def __init__(self, mm, offs, base: int, parity: int, n: int):
+        self.mm, self.offs, self.base, self.parity, self.n = mm, offs, base, parity, n
+        self.changed = {}
+        self.added = []
+
+    def __len__(self):
+        return self.n + len(self.added)
+
+    def raw(self, i: int) -> bytes:
+        if i >= self.n:
+            return self.added[i - self.n].encode("utf-8")
+        s = self.changed.get(i)
+        if s is not None:
+            return s.encode("utf-8")
+        k = 2 * i + self.parity
+        return self.mm[self.base + self.offs[k]:self.base + self.offs[k + 1]]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if i >= self.n:
+            return self.added[i - self.n]
+        s = self.changed.get(i)
+        if s is None:
+            k = 2 * i + self.parity
+            s = str(self.mm[self.base + self.offs[k]:self.base + self.offs[k + 1]], "utf-8")
+        return s
+
+    def __setitem__(self, i: int, value: str):
+        if i >= self.n:
+            self.added[i - self.n] = value
+        else:
+            self.changed[i] = value
+
+    def append(self, value: str):
+        self.added.append(value)
+
+    def frozen(self) -> "MappedStrings":
+        """Arka plan yazımı için o anki hâlin kopyası (eşleme paylaşılır)."""
+        f = MappedStrings(self.mm, self.offs, self.base, self.parity, self.n)
+        f.changed, f.added = dict(self.changed), list(self.added)
+        return f
+
+    def close(self):
+        self.offs.release()
+        self.mm.close()
+
+def _binary_snapshot(data, seq: int, agg: dict):
+    """Sütunları kopyalar ve ikili dosyayı yazacak fonksiyonu döndürür
+    (metinler yazım sırasında kodlanır)."""
+    cards = data["cards"]
+    n = len(cards)
+    cols = [getattr(cards, name)[:] for name, _ in _BIN_COLUMNS]
+
+    def encoder(strings):
+        if isinstance(strings, MappedStrings):
+            return strings.frozen().raw
+        items = list(strings)
+        return lambda i: items[i].encode("utf-8")
+    en, tr = encoder(cards.en), encoder(cards.tr)
+    meta = {k: v for k, v in data.items() if k != "cards"}
+    meta["agg"] = agg
+    meta["_extra"] = {str(i): v for i, v in cards.extra.items()}
+    meta = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def write(json_path: str):
+        js = os.stat(json_path)
+        bpath = json_path + BINARY_SUFFIX
+        starts = _bin_starts(n)
+        fd, tmp = _mkstemp_like(bpath)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for a, pos in zip(cols, starts):
+                    f.seek(pos); f.write(a.tobytes())
+                f.seek(starts[-1])
+                offs, total, chunk = array("Q", [0]), 0, []
+                for i in range(n):
+                    for b in (en(i), tr(i)):
+                        chunk.append(b); total += len(b); offs.append(total)
+                    if len(chunk) >= 8192:
+                        f.write(b"".join(chunk)); chunk.clear()
+                f.write(b"".join(chunk))
+                offs_pos = (starts[-1] + total + 7) & ~7
+                f.seek(offs_pos); f.write(offs.tobytes())
+                meta_pos = offs_pos + 8 * len(offs)
+                f.write(meta)
+                f.seek(0)
+                f.write(_BIN_HEADER.pack(_BIN_MAGIC, n, seq, js.st_mtime_ns, js.st_size,
+                                         offs_pos, meta_pos, len(meta)))
+                f.flush(); os.fsync(f.fileno())
+            try:
+                os.replace(tmp, bpath)
+            except PermissionError:   # Windows: bpath hâlâ eşlenmiş
+                os.replace(tmp, bpath + ".new")
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass   # ikili kopya yalnızca hızlandırma; JSON zaten yazıldı
+    return write
+
+def _binary_enabled(data) -> bool:
+    return BINARY_SNAPSHOT and _BIN_OK and isinstance(data["cards"], ColumnarDeck)
+
+def _load_binary(path: str) -> Optional[dict]:
+    """JSON ile eşleşen ikili snapshot varsa mmap ile açar; yoksa None."""
+    bpath = path + BINARY_SUFFIX
+    if os.path.exists(bpath + ".new"):
+        try:
+            os.replace(bpath + ".new", bpath)
+        except OSError:
+            pass
+    try:
+        with open(bpath, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):   # yok ya da boş
+        return None
+    try:
+        magic, n, seq, mtime, size, offs_pos, meta_pos, meta_len = _BIN_HEADER.unpack_from(mm)
+        js = os.stat(path)
+        if magic != _BIN_MAGIC or (mtime, size) != (js.st_mtime_ns, js.st_size) \
+                or meta_pos + meta_len > len(mm) or offs_pos + 8 * (2 * n + 1) != meta_pos:
+            raise ValueError
+        deck = ColumnarDeck()
+        for (name, code), pos in zip(_BIN_COLUMNS, _bin_starts(n)):
+            a = array(code)
+            a.frombytes(mm[pos:pos + a.itemsize * n])
+            setattr(deck, name, a)
+        data = json.loads(mm[meta_pos:meta_pos + meta_len])
+        deck.extra = {int(k): v for k, v in data.pop("_extra").items()}
+    except (OSError, ValueError, KeyError, struct.error):
+        mm.close()
+        return None
+    offs = memoryview(mm)[offs_pos:meta_pos].cast("Q")
+    base = _bin_starts(n)[-1]
+    deck.en = MappedStrings(mm, offs, base, 0, n)
+    deck.tr = MappedStrings(mm, offs, base, 1, n)
+    data["cards"], data["seq"] = deck, seq
+    return data
+
+# ---------- Deste istatistikleri (artımlı) ----------
+# Kutu dağılımı, doğru/yanlış toplamları ve gün başına "next" histogramı
+# bellekte tutulur; schedule()+record_review, kart ekleme ve sıfırlama
+# bunları O(1) günceller. Bugün due sayısı histogramdan bulunur ve gün
+# değişene kadar önbellekte kalır. Değerler snapshot'a "agg" olarak yazılır,
+# açılışta günlükle birlikte ilerletilip tam sayımla karşılaştırılır.
+class DeckAggregate:
+    def __init__(self):
+        self.n = 0
+        self.correct = 0
+        self.wrong = 0
+        self.box = Counter()
+        self.days = Counter()     # next (gün sırası) -> kart sayısı
+        self._due_day = None
+        self._due = 0
+
+    @staticmethod
+    def state(card) -> tuple:
+        st = card["stats"]
+        return card["box"], _ordinal_of(card["next"]), st["correct"], st["wrong"]
+
+    @classmethod
+    def count(cls, cards) -> "DeckAggregate":
+        agg = cls()
+        if isinstance(cards, ColumnarDeck):
+            agg.n = len(cards)
+            agg.correct, agg.wrong = sum(cards.correct), sum(cards.wrong)
+            agg.box.update(cards.box); agg.days.update(cards.next)
+            return agg
+        for c in cards:
+            agg._add(*cls.state(c))
+        return agg
+
+    def _add(self, box, day, correct, wrong, k=1):
+        self.n += k; self.correct += k * correct; self.wrong += k * wrong
+        self.box[box] += k; self.days[day] += k
+        if self._due_day is not None and day <= self._due_day:
+            self._due += k
+        if self.box[box] == 0: del self.box[box]
+        if self.days[day] == 0: del self.days[day]
+
+    def add(self, card):
+        self._add(*self.state(card))
+
+    def review(self, before: tuple, card):
+        self._add(*before, k=-1)
+        self._add(*self.state(card))
+
+    def reset(self, n: int, today: str):
+        self.n, self.correct, self.wrong = n, 0, 0
+        self.box = Counter({0: n}) if n else Counter()
+        self.days = Counter({_ordinal_of(today): n}) if n else Counter()
+        self._due_day = None
+
+    def due(self, today: Optional[str] = None) -> int:
+        t = _ordinal_of(today or date.today().isoformat())
+        if t != self._due_day:
+            self._due = sum(v for d, v in self.days.items() if d <= t)
+            self._due_day = t
+        return self._due
+
+    def to_json(self) -> dict:
+        return {"n": self.n, "correct": self.correct, "wrong": self.wrong,
+                "box": {str(k): v for k, v in sorted(self.box.items())},
+                "days": {_iso_of(k): v for k, v in sorted(self.days.items())}}
+
+    @classmethod
+    def from_json(cls, d: dict) -> "DeckAggregate":
+        agg = cls()
+        agg.n, agg.correct, agg.wrong = d["n"], d["correct"], d["wrong"]
+        agg.box = Counter({int(k): v for k, v in d["box"].items()})
+        agg.days = Counter({_ordinal_of(k): v for k, v in d["days"].items()})
+        return agg
+
+    def same(self, other: "DeckAggregate") -> bool:
+        return (self.n, self.correct, self.wrong, +self.box, +self.days) == \
+               (other.n, other.correct, other.wrong, +other.box, +other.days)
+
+_unsaved = {}   # kart anahtarı -> (kart, schedule öncesi durum)
+
+def _review_key(card):
+    return (id(card.deck), card.pos) if isinstance(card, CardView) else id(card)
+
+def _note_before_review(card):
+    """schedule() değiştirmeden önceki durumu, kayıt anına kadar saklar."""
+    key = _review_key(card)
+    prev = _unsaved.get(key)
+    if prev is None or (prev[0] is not card and not isinstance(card, CardView)):
+        _unsaved[key] = (card, DeckAggregate.state(card))
+
+def _after_review(data, card, i: int):
+    prev = _unsaved.pop(_review_key(card), None)
+    st = _decks.get(id(data))
+    if st is None:
+        return
+    if st.queue is not None:
+        st.queue.moved(i)
+    if prev is None or st.agg is None:
+        return
+    if prev[0] is card or isinstance(card, CardView):
+        st.agg.review(prev[1], card)
+
+def deck_agg(data) -> DeckAggregate:
+    st = _decks.get(id(data))
+    if st is None:
+        return DeckAggregate.count(data["cards"])
+    if st.agg is None:
+        st.agg = DeckAggregate.count(data["cards"])
+    return st.agg
+
+# ---------- Kalıcılık: snapshot + günlük (journal) ----------
+# Her cevapta bütün desteyi yeniden yazmak yerine DATA_FILE + ".journal"
+# dosyasına tek satırlık bir kayıt eklenir. Snapshot (DATA_FILE) arada bir
+# arka planda atomik olarak (geçici dosya + os.replace) yeniden yazılır;
+# load_data açılışta snapshot + günlüğü oynatır.
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_EVERY = 500   # bu kadar kayıttan sonra snapshot tazelenir
+
+class _DeckState:
+    def __init__(self, path: str):
+        self.path = path
+        self.seq = 0            # son yazılan günlük kaydının sıra numarası
+        self.pending = 0        # son snapshot'tan beri eklenen kayıt sayısı
+        self.lock = threading.RLock()
+        self.pos = {}           # id(card) -> desteki sırası
+        self.fh = None          # günlük dosyası (append)
+        self.compactor = None   # son arka plan sıkıştırma thread'i
+        self.db = None          # STORAGE == "sqlite" ise _SqliteStore
+        self.agg = None         # DeckAggregate (ilk kullanımda sayılır)
+        self.queue = None       # DueQueue (ilk kullanımda kurulur)
+
+_decks = {}        # id(data) -> _DeckState
+_open_paths = {}   # path -> data (aynı dosya için tek bellek kopyası)
+_deck_registries = []   # id(cards) anahtarlı dizin önbellekleri (unload_data temizler)
+
+def _index_registry() -> dict:
+    registry = {}
+    _deck_registries.append(registry)
+    return registry
+
+def _deck_state(data, path: Optional[str] = None) -> _DeckState:
+    st = _decks.get(id(data))
+    if st is None:
+        st = _decks[id(data)] = _DeckState(path or DATA_FILE)
+        _open_paths.setdefault(st.path, data)
+    return st
+
+_UMASK = os.umask(0); os.umask(_UMASK)
+
+def _mkstemp_like(path: str):
+    """path'in yanında geçici dosya; izinler open() ile yazılmış gibi olsun."""
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=d)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    try:
+        os.chmod(tmp, mode)
+    except OSError:
+        pass
+    return fd, tmp
+
+def _atomic_write_text(path: str, text: str):
+    fd, tmp = _mkstemp_like(path)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _reset_cards(cards, today: str):
+    if isinstance(cards, ColumnarDeck):
+        cards.reset(today); return
+    for c in cards:
+        c["box"] = 0
+        c["next"] = today
+        c["stats"] = {"correct": 0, "wrong": 0}
+
+def _apply_record(data, rec: dict):
+    op = rec.get("op")
+    cards = data["cards"]
+    st = _decks.get(id(data))
+    agg = st.agg if st is not None else None
+    if op == "review":
+        c = cards[rec["i"]]
+        before = DeckAggregate.state(c)
+        c["box"] = rec["box"]; c["next"] = rec["next"]; c["stats"] = rec["stats"]
+        if agg is not None: agg.review(before, c)
+        if st is not None and st.queue is not None: st.queue.moved(rec["i"])
+    elif op == "add":
+        cards.append(rec["card"])
+        if agg is not None: agg.add(rec["card"])
+    elif op == "edit":
+        cards[rec["i"]]["tr"] = rec["tr"]
+    elif op == "reset":
+        _reset_cards(cards, rec["next"])
+        if agg is not None: agg.reset(len(cards), rec["next"])
+        if st is not None and st.queue is not None: st.queue.reset(rec["next"])
+
+def _replay_journal(data, path: str, base_seq: int) -> int:
+    """Snapshot'tan sonraki kayıtları uygular; son sıra numarasını döndürür."""
+    seq = base_seq
+    try:
+        f = open(path + JOURNAL_SUFFIX, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return seq
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # yarım yazılmış son satır
+            if rec.get("seq", 0) <= seq:
+                continue
+            _apply_record(data, rec)
+            seq = rec["seq"]
+    return seq
+
+def _journal_append(data, rec: dict):
+    st = _deck_state(data)
+    if st.db is not None:
+        st.db.apply(rec); return
+    with st.lock:
+        st.seq += 1
+        rec["seq"] = st.seq
+        if st.fh is None:
+            st.fh = open(st.path + JOURNAL_SUFFIX, "a", encoding="utf-8")
+        st.fh.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        st.fh.flush()
+        st.pending += 1
+        full = st.pending >= JOURNAL_COMPACT_EVERY
+    if full:
+        compact_data(data)
+
+def _trim_journal(st: _DeckState, upto: int):
+    """Snapshot'a girmiş (seq <= upto) kayıtları günlükten atar."""
+    jpath = st.path + JOURNAL_SUFFIX
+    with st.lock:
+        if st.fh is not None:
+            st.fh.close(); st.fh = None
+        try:
+            with open(jpath, "r", encoding="utf-8") as f:
+                keep = [l for l in f if l.strip() and json.loads(l).get("seq", 0) > upto]
+        except (FileNotFoundError, ValueError):
+            keep = []
+        if keep:
+            _atomic_write_text(jpath, "".join(keep))
+        else:
+            try:
+                os.remove(jpath)
+            except FileNotFoundError:
+                pass
+
+def _card_index(data, card) -> int:
+    if isinstance(card, CardView) and card.deck is data["cards"]:
+        return card.pos
+    st = _deck_state(data)
+    cards = data["cards"]
+    i = st.pos.get(id(card))
+    if i is None or i >= len(cards) or cards[i] is not card:
+        st.pos = {id(c): n for n, c in enumerate(cards)}
+        i = st.pos[id(card)]
+    return i
+
+def record_review(data, card):
+    """schedule() sonucunu günlüğe yazar (bütün desteyi yazmaz)."""
+    i = _card_index(data, card)
+    _after_review(data, card, i)
+    _journal_append(data, {"op": "review", "i": i,
+                           "box": card["box"], "next": card["next"],
+                           "stats": dict(card["stats"])})
+
+def _commit_bulk(data, recs):
+    """Bellekte zaten uygulanmış çok sayıda kaydı tek yazımla kalıcılaştırır."""
+    st = _deck_state(data)
+    for rec in recs:
+        if rec["op"] == "review":
+            _after_review(data, data["cards"][rec["i"]], rec["i"])
+        elif rec["op"] == "add" and st.agg is not None:
+            st.agg.add(rec["card"])
+    if st.db is not None:
+        st.db.apply_many(recs); return
+    compact_data(data, wait=True)
+
+def append_card(data, card: dict):
+    agg = deck_agg(data)   # eklemeden önce: tembel sayım yeni kartı iki kez saymasın
+    data["cards"].append(card)
+    agg.add(card)
+    _deck_state(data).pos[id(card)] = len(data["cards"]) - 1
+    _journal_append(data, {"op": "add", "card": card})
+
+def compact_data(data, wait: bool = False):
+    """Snapshot'ı yeniden yazar ve günlüğü kısaltır; varsayılan arka planda."""
+    st = _deck_state(data)
+    if st.db is not None:
+        return  # her kayıt zaten kendi işleminde yazıldı
+    with st.lock:
+        upto = st.seq
+        agg = deck_agg(data).to_json()
+        snap = _deck_copy(data)
+        st.pending = 0
+        prev = st.compactor
+
+    def work():
+        text = _deck_json_text(snap, upto, agg)
+        if prev is not None:
+            prev.join()
+        _atomic_write_text(st.path, text)
+        if _binary_enabled(snap):
+            _binary_snapshot(snap, upto, agg)(st.path)
+        _trim_journal(st, upto)
+
+    if wait:
+        work()
+        return
+    t = threading.Thread(target=work, name="deck-compact")
+    st.compactor = t
+    t.start()
+
+def unload_data(data):
+    """Bekleyen yazımları tamamlar ve desteyi bellek önbelleğinden çıkarır;
+    aynı yol için sonraki load_data diskten okur."""
+    st = _decks.get(id(data))
+    if st is None:
+        return
+    if st.pending:
+        compact_data(data, wait=True)
+    elif st.compactor is not None:
+        st.compactor.join()
+    with st.lock:
+        if st.fh is not None:
+            st.fh.close(); st.fh = None
+    del _decks[id(data)]
+    if _open_paths.get(st.path) is data:
+        del _open_paths[st.path]
+    _card_dbs.pop(id(data["cards"]), None)
+    for registry in _deck_registries:
+        registry.pop(id(data["cards"]), None)
+    if isinstance(data["cards"], ColumnarDeck):
+        data["cards"].close()
+
+def close_data():
+    """Bekleyen sıkıştırmaları bitirir, günlüğü snapshot'a katar."""
+    for data in list(_open_paths.values()):
+        unload_data(data)
+    for store in _sqlite_stores.values():
+        store.close()
+    _sqlite_stores.clear()
+
+atexit.register(close_data)
+
+# ---------- SQLite deposu (isteğe bağlı) ----------
+# STORAGE = "sqlite" iken kartlar ve kullanıcılar DB_FILE içinde tutulur;
+# load_data/save_data, load_users/save_users aynı sözlük yapısını döndürür.
+# Günlük kayıtları (review/add/reset) tek satırlık ya da toplu SQL ifadelerine
+# dönüşür; due kuyruğu ve due_cards indeksli sorgu kullanır. İlk açılışta
+# mevcut JSON dosyaları bir kez içeri aktarılır.
+STORAGE = os.environ.get("STUDY_STORAGE", "json")   # "json" | "sqlite"
+DB_FILE = "study.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    id      INTEGER PRIMARY KEY,
+    en      TEXT NOT NULL,
+    tr      TEXT NOT NULL,
+    box     INTEGER NOT NULL DEFAULT 0,
+    next    TEXT NOT NULL,
+    correct INTEGER NOT NULL DEFAULT 0,
+    wrong   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cards_next ON cards(next);
+CREATE INDEX IF NOT EXISTS cards_box  ON cards(box);
+CREATE TABLE IF NOT EXISTS users (
+    key       TEXT PRIMARY KEY,
+    name      TEXT NOT NULL,
+    sessions  INTEGER NOT NULL DEFAULT 0,
+    turns     INTEGER NOT NULL DEFAULT 0,
+    words     INTEGER NOT NULL DEFAULT 0,
+    last_seen TEXT,
+    extra     TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+_USER_COLS = ("name", "sessions", "turns", "words", "last_seen")
+
+class _SqliteStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.ids = []       # deste sırası -> cards.id
+        self.pos_of = {}    # cards.id -> deste sırası
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, value))
+
+    # --- kartlar ---
+    def load_cards(self) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, en, tr, box, next, correct, wrong FROM cards ORDER BY id").fetchall()
+        self.ids = [r[0] for r in rows]
+        self.pos_of = {cid: n for n, cid in enumerate(self.ids)}
+        return [{"en": en, "tr": tr, "box": box, "next": nxt,
+                 "stats": {"correct": cor, "wrong": wr}}
+                for _, en, tr, box, nxt, cor, wr in rows]
+
+    def _insert(self, card: dict) -> int:
+        cur = self.conn.execute(
+            "INSERT INTO cards(en, tr, box, next, correct, wrong) VALUES (?, ?, ?, ?, ?, ?)",
+            (card["en"], card["tr"], card.get("box", 0), card["next"],
+             card["stats"]["correct"], card["stats"]["wrong"]))
+        cid = cur.lastrowid
+        self.pos_of[cid] = len(self.ids); self.ids.append(cid)
+        return cid
+
+    def _apply_one(self, rec: dict):
+        op = rec.get("op")
+        if op == "review":
+            st = rec["stats"]
+            self.conn.execute(
+                "UPDATE cards SET box=?, next=?, correct=?, wrong=? WHERE id=?",
+                (rec["box"], rec["next"], st["correct"], st["wrong"], self.ids[rec["i"]]))
+        elif op == "add":
+            self._insert(rec["card"])
+        elif op == "edit":
+            self.conn.execute("UPDATE cards SET tr=? WHERE id=?", (rec["tr"], self.ids[rec["i"]]))
+        elif op == "reset":
+            self.conn.execute("UPDATE cards SET box=0, next=?, correct=0, wrong=0", (rec["next"],))
+
+    def apply(self, rec: dict):
+        self.apply_many([rec])
+
+    def apply_many(self, recs):
+        """Kayıtları tek işlemde (transaction) uygular."""
+        with self.lock, self.conn:
+            for rec in recs:
+                self._apply_one(rec)
+
+    def replace_cards(self, cards):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM cards")
+            self.ids, self.pos_of = [], {}
+            for c in cards:
+                self._insert(c)
+
+    def due_positions(self, today: str) -> list:
+        with self.lock:
+            rows = self.conn.execute("SELECT id FROM cards WHERE next <= ?", (today,)).fetchall()
+        return sorted(self.pos_of[r[0]] for r in rows)
+
+    def ahead_positions(self, today: str, k: int) -> list:
+        with self.lock:
+            rows = self.conn.execute("SELECT id FROM cards WHERE next > ? ORDER BY next, id LIMIT ?",
+                                     (today, k)).fetchall()
+        return [self.pos_of[r[0]] for r in rows]
+
+    # --- kullanıcılar ---
+    def load_users(self) -> dict:
+        users = {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, name, sessions, turns, words, last_seen, extra FROM users").fetchall()
+            vocab = self.meta("vocab")
+        for key, name, sessions, turns, words, last_seen, extra in rows:
+            u = json.loads(extra) if extra else {}
+            u.update(name=name, sessions=sessions, turns=turns, words=words, last_seen=last_seen)
+            users[key] = u
+        return {"users": users, "vocab": json.loads(vocab) if vocab else []}
+
+    def save_users(self, u: dict, keys=None):
+        recs = u["users"] if keys is None else {k: u["users"][k] for k in keys}
+        rows = []
+        for key, rec in recs.items():
+            extra = {k: v for k, v in rec.items() if k not in _USER_COLS}
+            rows.append((key.lower(), rec["name"], rec.get("sessions", 0), rec.get("turns", 0),
+                         rec.get("words", 0), rec.get("last_seen"),
+                         json.dumps(extra, ensure_ascii=False) if extra else None))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO users(key, name, sessions, turns, words, last_seen, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            if keys is None:
+                self.set_meta("vocab", json.dumps(u.get("vocab", []), ensure_ascii=False))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_sqlite_stores = {}   # path -> _SqliteStore
+_card_dbs = {}        # id(data["cards"]) -> _SqliteStore
+
+def _read_json_deck(path: str) -> Optional[dict]:
+    """JSON snapshot + günlüğü okur (kaydetmeden)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _replay_journal(data, path, data.pop("seq", 0))
+    return data
+
+def migrate_json_to_sqlite(db_file: Optional[str] = None, data_file: Optional[str] = None,
+                           user_file: Optional[str] = None):
+    """DATA_FILE/USER_DATA JSON dosyalarını DB_FILE'a bir kez aktarır.
+    (aktarılan kart, aktarılan kullanıcı) döndürür."""
+    store = _sqlite_store(db_file or DB_FILE, migrate=False)
+    deck = _read_json_deck(data_file or DATA_FILE)
+    n_cards = n_users = 0
+    if deck is not None:
+        store.replace_cards(deck["cards"]); n_cards = len(deck["cards"])
+    user_file = user_file or USER_DATA
+    if os.path.exists(user_file):
+        with open(user_file, "r", encoding="utf-8") as f:
+            u = json.load(f)
+        u["users"] = {k.lower(): v for k, v in u.get("users", {}).items()}
+        store.save_users(u); n_users = len(u["users"])
+    with store.lock, store.conn:
+        store.set_meta("migrated", datetime.now().isoformat(timespec="seconds"))
+    return n_cards, n_users
+
+def _sqlite_store(path: Optional[str] = None, migrate: bool = True) -> _SqliteStore:
+    path = path or DB_FILE
+    store = _sqlite_stores.get(path)
+    if store is None:
+        store = _sqlite_stores[path] = _SqliteStore(path)
+        if migrate and path == DB_FILE and store.meta("migrated") is None:
+            n_cards, n_users = migrate_json_to_sqlite(path)
+            if n_cards or n_users:
+                print(f"(JSON verisi SQLite'a aktarıldı: {n_cards} kart, {n_users} kullanıcı)")
+    return store
+
+def load_data(path: Optional[str] = None):
+    if STORAGE == "sqlite":
+        return _load_sqlite_deck(path or DB_FILE)
+    path = path or DATA_FILE
+    if path in _open_paths:
+        return _open_paths[path]
+    if not os.path.exists(path):
+        today = date.today().isoformat()
+        cards = [new_card(en, tr, today) for en, tr in B1_DEFAULTS]
+        _atomic_write_text(path, json.dumps({"cards": cards, "seq": 0}, ensure_ascii=False, indent=2))
+    data = _load_binary(path) if BINARY_SNAPSHOT and _BIN_OK else None
+    mapped = data is not None
+    if not mapped:
+        columnar = COLUMNAR_MIN_BYTES is not None and os.path.getsize(path) >= COLUMNAR_MIN_BYTES
+        with open(path, "r", encoding="utf-8") as f:
+            data = ColumnarDeck.load_json(f) if columnar else json.load(f)
+    base = data.pop("seq", 0)
+    saved = data.pop("agg", None)
+    st = _deck_state(data, path)
+    if saved is not None:
+        try:
+            st.agg = DeckAggregate.from_json(saved)
+        except (KeyError, TypeError, ValueError):
+            pass
+    st.seq = _replay_journal(data, path, base)
+    fresh = DeckAggregate.count(data["cards"])
+    if st.agg is not None and not st.agg.same(fresh):
+        print("(Uyarı: kayıtlı deste istatistikleri tutmadı; yeniden sayıldı.)")
+    st.agg = fresh
+    if st.seq > base:
+        st.pending = st.seq - base
+        compact_data(data)
+    elif not mapped and _binary_enabled(data):
+        # JSON ikili kopyadan yeni (ya da kopya yok): yalnızca onu üret
+        with st.lock:
+            snap, agg = _deck_copy(data), st.agg.to_json()
+        st.compactor = threading.Thread(target=lambda: _binary_snapshot(snap, base, agg)(path),
+                                        name="deck-compact")
+        st.compactor.start()
+    return data
 
-def load_data():
-    today = date.today().isoformat()
-    if not os.path.exists(DATA_FILE):
-        cards = [{"en": en, "tr": tr, "box": 0, "next": today, "stats": {"correct": 0, "wrong": 0}}
-                 for en, tr in B1_DEFAULTS]
-        save_data({"cards": cards})
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _load_sqlite_deck(path: str):
+    if path in _open_paths:
+        return _open_paths[path]
+    store = _sqlite_store(path)
+    cards = store.load_cards()
+    if not cards:
+        today = date.today().isoformat()
+        store.replace_cards([new_card(en, tr, today) for en, tr in B1_DEFAULTS])
+        cards = store.load_cards()
+    data = {"cards": cards}
+    _deck_state(data, path).db = store
+    _card_dbs[id(cards)] = store
+    return data
 
 def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Tam snapshot (senkron). Cevap başına kayıt için record_review kullanın."""
+    st = _deck_state(data)
+    st.agg = st.queue = None   # kartlar toptan değişmiş olabilir
+    if st.db is not None:
+        st.db.replace_cards(data["cards"]); return
+    compact_data(data, wait=True)
+
+# ---------- Kullanıcı istatistikleri (write-behind) ----------
+# Konuşma turları user_rec kayıtlarını yalnızca bellekte günceller ve
+# touch_user ile "kirli" işaretler. Kirli kayıtlar USER_FLUSH_INTERVAL
+# saniyede bir, çıkışta ve Ctrl+C'de toplu yazılır; JSON modunda her kullanıcı
+# USER_SHARD_DIR altında kendi dosyasına yazılır, böylece bir kullanıcının
+# turu diğerlerinin kaydını yeniden yazmaz. USER_DATA temel dosya olarak
+# okunur, parça dosyaları onun üzerine uygulanır.
+USER_SHARD_DIR = "conversation_users"
+USER_FLUSH_INTERVAL = 5.0   # saniye
+
+def _user_shard_path(key: str) -> str:
+    slug = re.sub(r"[^\w-]", "_", key)[:40]
+    return os.path.join(USER_SHARD_DIR, f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}.json")
+
+def _write_user_shards(recs: dict):
+    if STORAGE == "sqlite":
+        _sqlite_store().save_users({"users": recs}, keys=list(recs)); return
+    os.makedirs(USER_SHARD_DIR, exist_ok=True)
+    for key, rec in recs.items():
+        _atomic_write_text(_user_shard_path(key),
+                           json.dumps({"key": key, "user": rec}, ensure_ascii=False, indent=2))
+
+class UserStatsWriter:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()      # kirli kümesi
+        self.io_lock = threading.Lock()   # yazma sırası (eski kopya yenisini ezmesin)
+        self.dirty = {}                   # id(users) -> (users, {anahtar})
+        self.timer = None
+
+    def touch(self, users, name: str):
+        with self.lock:
+            self.dirty.setdefault(id(users), (users, set()))[1].add(name.lower())
+            if self.timer is None:
+                self.timer = threading.Timer(self.interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    @staticmethod
+    def _copy(rec: dict) -> dict:
+        # "vocab" gibi iç sözlükler turlar sürerken büyür; yazım kopyadan yapılır
+        return {k: v.copy() if isinstance(v, (dict, list)) else v for k, v in rec.items()}
+
+    def flush(self):
+        with self.io_lock:
+            with self.lock:
+                batch = [(users, {k: self._copy(users["users"][k]) for k in keys if k in users["users"]})
+                         for users, keys in self.dirty.values()]
+                self.dirty.clear()
+                if self.timer is not None:
+                    self.timer.cancel(); self.timer = None
+            for users, recs in batch:
+                if not recs:
+                    continue
+                try:
+                    _write_user_shards(recs)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"(Uyarı: kullanıcı kayıtları yazılamadı, tekrar denenecek: {e})")
+                    for k in recs:
+                        self.touch(users, k)
+
+USER_WRITER = UserStatsWriter(USER_FLUSH_INTERVAL)
+atexit.register(USER_WRITER.flush)
+
+def touch_user(users, name: str):
+    """Kullanıcı kaydı değişti; bir sonraki toplu yazımda diske gider."""
+    USER_WRITER.touch(users, name)
+
+def flush_users():
+    USER_WRITER.flush()
 
 def load_users():
+    if STORAGE == "sqlite":
+        return _sqlite_store().load_users()
     if not os.path.exists(USER_DATA):
         with open(USER_DATA, "w", encoding="utf-8") as f:
             json.dump({"users": {}, "vocab": []}, f, ensure_ascii=False, indent=2)
     with open(USER_DATA, "r", encoding="utf-8") as f:
-        return json.load(f)
+        u = json.load(f)
+    if os.path.isdir(USER_SHARD_DIR):
+        for de in os.scandir(USER_SHARD_DIR):
+            if not de.name.endswith(".json"):
+                continue
+            try:
+                with open(de.path, "r", encoding="utf-8") as f:
+                    shard = json.load(f)
+                u["users"][shard["key"]] = shard["user"]
+            except (OSError, ValueError, KeyError):
+                pass
+    return u
 
 def save_users(u):
-    with open(USER_DATA, "w", encoding="utf-8") as f:
-        json.dump(u, f, ensure_ascii=False, indent=2)
+    """Tüm kullanıcıları tek seferde yazar (parça dosyaları bu yazıma katılır)."""
+    if STORAGE == "sqlite":
+        _sqlite_store().save_users(u); return
+    _atomic_write_text(USER_DATA, json.dumps(u, ensure_ascii=False, indent=2))
+    if os.path.isdir(USER_SHARD_DIR):
+        for de in os.scandir(USER_SHARD_DIR):
+            if de.name.endswith(".json"):
+                try:
+                    os.remove(de.path)
+                except OSError:
+                    pass
 
 # ---------- Yardımcılar ----------
 _punct_re = re.compile(r"[^\w\sçğıöşüÇĞİÖŞÜ/-]")
+_space_re = re.compile(r"\s+")
 def normalize(s: str) -> str:
     s = s.strip().lower()
     s = _punct_re.sub("", s)
-    s = re.sub(r"\s+", " ", s)
+    s = _space_re.sub(" ", s)
     return s
 
+# ---------- Cevap eşleştirme ----------
+# Doğru cevabın varyantları (";" veya "/" ile ayrılmış) bir kez normalize
+# edilip AnswerMatcher içinde saklanır; kart metni değişince anahtar da
+# değiştiği için yeni bir eşleştirici kurulur. Benzerlik ölçüsü
+# 2*LCS/(len(a)+len(b)) (difflib ratio'nun tam hâli); eşik, ekle/sil
+# mesafesi için bir üst sınıra çevrilip bantlı DP ile erken çıkışla denetlenir.
+MATCH_THRESHOLD = 0.80
+_variant_re = re.compile(r"[;/]")
+
+def _indel_within(a: str, b: str, k: int) -> bool:
+    """a ile b arasındaki ekle/sil mesafesi <= k mı?"""
+    la, lb = len(a), len(b)
+    if abs(la - lb) > k:
+        return False
+    # ortak önek/sonek mesafeyi değiştirmez
+    p = 0
+    while p < la and p < lb and a[p] == b[p]:
+        p += 1
+    q = 0
+    while q < la - p and q < lb - p and a[la - 1 - q] == b[lb - 1 - q]:
+        q += 1
+    a, b = a[p:la - q], b[p:lb - q]
+    la, lb = la - p - q, lb - p - q
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    if la == 0:
+        return lb <= k
+    inf = k + 1
+    prev = [j if j <= k else inf for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        cur = [inf] * (lb + 1)
+        cur[0] = i if i <= k else inf
+        row_min = cur[0]
+        ai = a[i - 1]
+        for j in range(max(1, i - k), min(lb, i + k) + 1):
+            if ai == b[j - 1]:
+                v = prev[j - 1]
+            else:
+                v = min(prev[j], cur[j - 1]) + 1
+                if v > k:
+                    v = inf
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > k:
+            return False
+        prev = cur
+    return prev[lb] <= k
+
+class AnswerMatcher:
+    __slots__ = ("correct", "variants", "exact", "counts", "threshold")
+
+    def __init__(self, correct: str, threshold: float = MATCH_THRESHOLD):
+        self.correct = correct
+        self.variants = tuple(dict.fromkeys(normalize(x) for x in _variant_re.split(correct)))
+        self.exact = frozenset(self.variants)
+        self.counts = tuple(Counter(v) for v in self.variants)
+        self.threshold = threshold
+
+    def match_normalized(self, u: str) -> bool:
+        if u in self.exact:
+            return True
+        slack = 1.0 - self.threshold
+        uc = None
+        for v, vc in zip(self.variants, self.counts):
+            # ratio >= eşik  <=>  indel <= (1 - eşik) * (len(u) + len(v))
+            k = int(slack * (len(u) + len(v)) + 1e-9)
+            if abs(len(u) - len(v)) > k:
+                continue
+            if uc is None:
+                uc = Counter(u)
+            # harf sayılarındaki fark mesafenin alt sınırıdır
+            if sum(((uc - vc) + (vc - uc)).values()) > k:
+                continue
+            if _indel_within(u, v, k):
+                return True
+        return False
+
+    def __call__(self, user: str) -> bool:
+        return self.match_normalized(normalize(user))
+
+@functools.lru_cache(maxsize=65536)
+def answer_matcher(correct: str) -> AnswerMatcher:
+    return AnswerMatcher(correct)
+
 def matches(user: str, correct: str) -> bool:
-    import difflib
-    u = normalize(user)
-    variants = [normalize(x) for x in re.split(r"[;/]", correct)]
-    if u in variants:
-        return True
-    best = max(difflib.SequenceMatcher(None, u, v).ratio() for v in variants) if variants else 0
-    return best >= 0.80
+    return answer_matcher(correct)(user)
 
 def due_cards(cards):
     today = date.today().isoformat()
+    db = _card_dbs.get(id(cards))
+    if db is not None:
+        return [cards[i] for i in db.due_positions(today)]
+    if isinstance(cards, ColumnarDeck):
+        return cards.due(today)
     return [c for c in cards if c["next"] <= today]
 
 def schedule(card, is_correct: bool):
+    _note_before_review(card)
     i = max(0, min(card.get("box", 0), len(INTERVALS) - 1))
     if is_correct:
         i = min(i + 1, len(INTERVALS) - 1); card["stats"]["correct"] += 1
@@ -278,7 +2154,7 @@ def schedule(card, is_correct: bool):
         i = max(i - 1, 0); card["stats"]["wrong"] += 1
     card["box"] = i
     ndays = INTERVALS[i]
-    card["next"] = (date.today() + timedelta(days=ndays)).isoformat()
+    card["next"] = _iso_of(date.today().toordinal() + ndays)
 
 def input_int(prompt, low, high):
     while True:
@@ -293,16 +2169,17 @@ def input_int(prompt, low, high):
 def add_word(data):
     en = input("İngilizce: ").strip()
     tr = input("Türkçe (alternatifleri ; ile ayır): ").strip()
-    data["cards"].append({"en": en, "tr": tr, "box": 0, "next": date.today().isoformat(),
-                          "stats": {"correct": 0, "wrong": 0}})
-    save_data(data); print(f'✓ Eklendi: "{en}" ↔ "{tr}"')
+    status = add_or_merge_card(data, en, tr)
+    if status == "added":
+        print(f'✓ Eklendi: "{en}" ↔ "{tr}"')
+    elif status == "merged":
+        print(f'✓ "{en}" zaten vardı; yeni karşılıklar eklendi.')
+    else:
+        print(f'"{en}" ↔ "{tr}" zaten sözlükte.')
 
 def show_stats(data):
-    cards = data["cards"]; total = len(cards); due = len(due_cards(cards))
-    corr = sum(c["stats"]["correct"] for c in cards)
-    wrong = sum(c["stats"]["wrong"] for c in cards)
-    by_box = {}
-    for c in cards: by_box[c["box"]] = by_box.get(c["box"], 0) + 1
+    agg = deck_agg(data)
+    total, due, corr, wrong, by_box = agg.n, agg.due(), agg.correct, agg.wrong, agg.box
     total_attempts = corr + wrong
     acc = (corr / total_attempts * 100) if total_attempts else 0.0
     print("\n--- İstatistikler ---")
@@ -310,6 +2187,610 @@ def show_stats(data):
     print("Kutu dağılımı:", ", ".join(f"Box {k}:{v}" for k,v in sorted(by_box.items())) or "—")
     print(f"Toplam doğruluk: {acc:.1f}%  (Doğru: {corr}, Yanlış: {wrong})\n")
 
+# ---------- Due kuyruğu ve tahmin ----------
+# Kart sıraları "next" gününe göre kovalarda (gün sırası -> array) tutulur;
+# bugünün due kartları yalnızca geçmiş/bugünkü kovalar okunarak O(due)
+# bulunur. Tekrar edilen kart yeni kovasına eklenir, eskisindeki kayıt
+# okunurken elenir (tembel silme); eskimiş kayıtlar kart sayısını aşınca
+# kuyruk yeniden kurulur; SQLite deposunda kovalar yerine cards_next indeksi
+# sorgulanır. Oturum sırası: en düşük kutu, en çok yanlış önce.
+DUE_SESSION_CAP = None    # oturum başına en çok kart (None: sınırsız)
+DUE_AHEAD_LIMIT = 20      # due kart yoksa çalışılacak en yakın tarihli kart sayısı
+FORECAST_DAYS = 30
+
+class DueQueue:
+    def __init__(self, cards):
+        self.cards = cards
+        self.buckets = {}     # gün sırası -> array("i") kart sıraları
+        self.n = 0
+        self.stale = 0
+        self.sync()
+
+    def _day(self, i: int) -> int:
+        cards = self.cards
+        if isinstance(cards, ColumnarDeck):
+            return cards.next[i]
+        return _ordinal_of(cards[i]["next"])
+
+    def _push(self, i: int):
+        d = self._day(i)
+        b = self.buckets.get(d)
+        if b is None:
+            b = self.buckets[d] = array("i")
+        b.append(i)
+
+    def sync(self):
+        for i in range(self.n, len(self.cards)):
+            self._push(i)
+        self.n = len(self.cards)
+
+    def moved(self, i: int):
+        """i. kartın "next" alanı değişti."""
+        if i >= self.n:
+            return
+        self._push(i)
+        self.stale += 1
+        if self.stale > self.n:
+            self.buckets, self.n, self.stale = {}, 0, 0
+            self.sync()
+
+    def reset(self, today: str):
+        self.buckets = {_ordinal_of(today): array("i", range(len(self.cards)))}
+        self.n, self.stale = len(self.cards), 0
+
+    def _take(self, days) -> list:
+        """Verilen kovalardaki geçerli, tekil sıralar; kovalar temizlenir."""
+        out, seen = [], set()
+        for d in days:
+            b = self.buckets[d]
+            keep = []
+            for i in b:
+                if i not in seen and self._day(i) == d:
+                    seen.add(i); keep.append(i)
+            self.stale -= len(b) - len(keep)
+            if keep:
+                self.buckets[d] = array("i", keep)
+            else:
+                del self.buckets[d]
+            out.extend(keep)
+        return out
+
+    def _prioritize(self, pos: list, cap: Optional[int]) -> list:
+        cards = self.cards
+        random.shuffle(pos)   # eşitlikler her oturumda farklı sırada gelsin
+        key = lambda i: (cards[i]["box"], -cards[i]["stats"]["wrong"])
+        if cap is not None and cap < len(pos):
+            return heapq.nsmallest(cap, pos, key=key)
+        pos.sort(key=key)
+        return pos
+
+    def due(self, today: Optional[str] = None, cap: Optional[int] = None) -> list:
+        """Bugün due kartların sıraları, öncelik sırasıyla."""
+        t = _ordinal_of(today or date.today().isoformat())
+        return self._prioritize(self._take(sorted(d for d in self.buckets if d <= t)), cap)
+
+    def ahead(self, k: int, today: Optional[str] = None) -> list:
+        """Due kart yoksa: en yakın tarihli k kart."""
+        t = _ordinal_of(today or date.today().isoformat())
+        out = []
+        for d in sorted(d for d in self.buckets if d > t):
+            out.extend(self._take([d]))
+            if len(out) >= k:
+                break
+        return out[:k]
+
+class SqliteDueQueue(DueQueue):
+    """SQLite deposunda kovalar tutulmaz; cards_next indeksi sorgulanır."""
+    def __init__(self, cards, db: _SqliteStore):
+        self.cards, self.db = cards, db
+        self.n = len(cards)
+
+    def sync(self):
+        self.n = len(self.cards)
+
+    def moved(self, i: int):
+        pass
+
+    def reset(self, today: str):
+        pass
+
+    def due(self, today: Optional[str] = None, cap: Optional[int] = None) -> list:
+        return self._prioritize(self.db.due_positions(today or date.today().isoformat()), cap)
+
+    def ahead(self, k: int, today: Optional[str] = None) -> list:
+        return self.db.ahead_positions(today or date.today().isoformat(), k)
+
+def due_queue(data) -> DueQueue:
+    st = _deck_state(data)
+    q = st.queue
+    if q is None or q.cards is not data["cards"] or q.n > len(data["cards"]):
+        cards = data["cards"]
+        q = st.queue = DueQueue(cards) if st.db is None else SqliteDueQueue(cards, st.db)
+    elif q.n < len(data["cards"]):
+        q.sync()
+    return q
+
+def session_cards(data, cap: Optional[int] = DUE_SESSION_CAP) -> list:
+    """Oturumda sorulacak kartlar: due olanlar, yoksa en yakın tarihliler."""
+    q = due_queue(data)
+    pos = q.due(cap=cap)
+    if not pos:
+        pos = q.ahead(min(cap or DUE_AHEAD_LIMIT, DUE_AHEAD_LIMIT))
+        if pos:
+            print(f"(Bugün due kart yok; en yakın tarihli {len(pos)} kart çalışılıyor.)")
+    cards = data["cards"]
+    return [cards[i] for i in pos]
+
+def review_forecast(cards, days: int = FORECAST_DAYS, today: Optional[str] = None) -> list:
+    """Önümüzdeki günler için beklenen tekrar sayıları (hepsi doğru bilinirse).
+    Kartlar tek geçişte (gün, kutu) sayılarına indirgenir; sonra yalnızca bu
+    sayılar INTERVALS'a göre ileri taşınır."""
+    t = _ordinal_of(today or date.today().isoformat())
+    if isinstance(cards, ColumnarDeck):
+        hist = Counter(zip(cards.next, cards.box))
+    else:
+        hist = Counter((_ordinal_of(c["next"]), c["box"]) for c in cards)
+    last = len(INTERVALS) - 1
+    grid = [Counter() for _ in range(days)]   # gün -> kutu -> kart sayısı
+    for (d, box), n in hist.items():
+        off = max(0, d - t)
+        if off < days:
+            grid[off][min(max(box, 0), last)] += n
+    out = []
+    for off in range(days):
+        out.append(sum(grid[off].values()))
+        for box, n in grid[off].items():
+            nb = min(box + 1, last)
+            nxt = off + max(1, INTERVALS[nb])
+            if nxt < days:
+                grid[nxt][nb] += n
+    return out
+
+def show_forecast(data, days: int = FORECAST_DAYS):
+    fc = review_forecast(data["cards"], days)
+    top = max(fc) or 1
+    print(f"\n--- Önümüzdeki {days} gün: beklenen tekrar sayısı ---")
+    start = date.today()
+    for off, n in enumerate(fc):
+        day = _iso_of(start.toordinal() + off)
+        print(f"{day}  {n:>6}  {'█' * max(1 if n else 0, round(40 * n / top))}")
+    print(f"Toplam: {sum(fc)}  |  Günlük ort.: {sum(fc) / days:.1f}")
+
+# ---------- Çeldirici dizini ----------
+# MCQ çeldiricileri her soruda bütün desteyi karıştırmak yerine, cevap
+# tarafına (en/tr), normalize uzunluğa ve ilk harfe göre kovalara ayrılmış bir
+# dizinden O(k) örneklenir: önce aynı uzunluk+ilk harf, sonra aynı/komşu
+# uzunluk, en son bütün deste. Dizin destede sona eklenen kartları bir
+# sonraki erişimde kendiliğinden ekler.
+DISTRACTOR_LEN_STEP = 3
+
+class DistractorIndex:
+    def __init__(self, cards):
+        self.cards = cards
+        self.n = 0
+        self.pos = {}    # id(card) -> sıra
+        self.norm = {"en": [], "tr": []}
+        self.by_len = {"en": {}, "tr": {}}
+        self.by_len_initial = {"en": {}, "tr": {}}
+        self.sync()
+
+    def _bucket(self, side: str, norm: str, i: int, add: bool):
+        lb = len(norm) // DISTRACTOR_LEN_STEP
+        for pools, key in ((self.by_len[side], lb), (self.by_len_initial[side], (lb, norm[:1]))):
+            if add:
+                pools.setdefault(key, []).append(i)
+            else:
+                pools[key].remove(i)
+
+    def sync(self):
+        """Son çağrıdan beri desteye eklenen kartları dizine katar."""
+        cards = self.cards
+        for i in range(self.n, len(cards)):
+            c = cards[i]
+            if not isinstance(c, CardView):   # görünümler geçicidir, id'leri tekrar kullanılır
+                self.pos[id(c)] = i
+            for side in ("en", "tr"):
+                norm = normalize(c[side])
+                self.norm[side].append(norm)
+                self._bucket(side, norm, i, True)
+        self.n = len(cards)
+
+    def reindex(self, i: int):
+        """i. kartın metni değişti (ör. karşılık katıldı): kovalarını tazeler."""
+        for side in ("en", "tr"):
+            old, norm = self.norm[side][i], normalize(self.cards[i][side])
+            if norm != old:
+                self._bucket(side, old, i, False)
+                self.norm[side][i] = norm
+                self._bucket(side, norm, i, True)
+
+    def _pools(self, side: str, norm: str):
+        lb = len(norm) // DISTRACTOR_LEN_STEP
+        yield self.by_len_initial[side].get((lb, norm[:1]), ())
+        for d in (0, 1, -1, 2, -2):
+            yield self.by_len[side].get(lb + d, ())
+        yield range(self.n)
+
+    def sample(self, card, side: str, k: int) -> list:
+        """card için side tarafından k farklı, makul çeldirici metni seçer."""
+        if isinstance(card, CardView) and card.deck is self.cards:
+            me = card.pos
+        else:
+            me = self.pos.get(id(card), -1)
+        answer = self.norm[side][me] if me >= 0 else normalize(card[side])
+        seen = {answer}
+        picked = []
+        for pool in self._pools(side, answer):
+            tries = 0
+            while len(picked) < k and pool and tries < 4 * k:
+                tries += 1
+                j = pool[random.randrange(len(pool))]
+                norm = self.norm[side][j]
+                if j != me and norm not in seen:
+                    seen.add(norm); picked.append(self.cards[j][side])
+            if len(picked) >= k:
+                break
+        return picked
+
+def _deck_index(registry: dict, cls, cards):
+    """id(cards) anahtarlı dizin önbelleği: yoksa ya da deste değiştiyse kurar,
+    kart eklendiyse artımlı günceller (cls(cards), .cards, .n, .sync()).
+    Düzenlenen kart için _upsert_card her dizinin .reindex(i)'ini çağırır."""
+    idx = registry.get(id(cards))
+    if idx is None or idx.cards is not cards or idx.n > len(cards):
+        idx = registry[id(cards)] = cls(cards)
+    elif idx.n < len(cards):
+        idx.sync()
+    return idx
+
+_distractor_indexes = _index_registry()   # id(cards) -> DistractorIndex
+
+def distractor_index(cards) -> DistractorIndex:
+    return _deck_index(_distractor_indexes, DistractorIndex, cards)
+
+def pick_distractors(pool, card, side: str, k: int) -> list:
+    return distractor_index(pool).sample(card, side, k)
+
+# ---------- Toplu içe/dışa aktarma ----------
+# CSV/TSV/Anki metin dışa aktarımları satır satır okunur. Kartlar normalize
+# edilmiş "en" anahtarıyla bir hash dizininde aranır: yeni kelime eklenir,
+# var olan kelimenin yeni Türkçe karşılıkları ";" ile "tr" alanına katılır,
+# aynısı atlanır. Bütün içe aktarma tek bir toplu yazımla kaydedilir.
+_html_tag_re = re.compile(r"<[^>]+>")
+_ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " "}
+_HEADER_WORDS = {"en", "english", "ingilizce", "i̇ngilizce", "front", "word"}
+
+class DeckKeyIndex:
+    def __init__(self, cards):
+        self.cards = cards
+        self.n = 0
+        self.by_en = {}   # normalize(en) -> sıra
+        self.sync()
+
+    def sync(self):
+        for i in range(self.n, len(self.cards)):
+            self.by_en.setdefault(normalize(self.cards[i]["en"]), i)
+        self.n = len(self.cards)
+
+    def reindex(self, i: int):
+        self.by_en.setdefault(normalize(self.cards[i]["en"]), i)
+
+    def find(self, en: str) -> Optional[int]:
+        return self.by_en.get(normalize(en))
+
+_key_indexes = _index_registry()   # id(cards) -> DeckKeyIndex
+
+def deck_key_index(cards) -> DeckKeyIndex:
+    return _deck_index(_key_indexes, DeckKeyIndex, cards)
+
+def _merge_alternatives(existing: str, new: str) -> Optional[str]:
+    """new içindeki yeni karşılıkları existing'e ekler; yeni yoksa None."""
+    have = {normalize(x) for x in _variant_re.split(existing)}
+    extra = []
+    for x in _variant_re.split(new):
+        nx = normalize(x)
+        if nx and nx not in have:
+            have.add(nx); extra.append(x.strip())
+    return ";".join([existing] + extra) if extra else None
+
+def _upsert_card(data, en: str, tr: str, idx: DeckKeyIndex, journal: bool = True) -> str:
+    cards = data["cards"]
+    i = idx.find(en)
+    if i is None:
+        card = new_card(en, tr)
+        if journal:
+            append_card(data, card)
+        else:
+            cards.append(card)
+        idx.sync()
+        return "added"
+    merged = _merge_alternatives(cards[i]["tr"], tr)
+    if merged is None:
+        return "duplicate"
+    cards[i]["tr"] = merged
+    for registry in _deck_registries:
+        other = registry.get(id(cards))
+        if other is not None and other.cards is cards and i < other.n:
+            other.reindex(i)
+    if journal:
+        _journal_append(data, {"op": "edit", "i": i, "tr": merged})
+    return "merged"
+
+def add_or_merge_card(data, en: str, tr: str) -> str:
+    """Kartı ekler ya da var olan kelimenin karşılıklarına katar.
+    "added" / "merged" / "duplicate" döndürür."""
+    return _upsert_card(data, en, tr, deck_key_index(data["cards"]))
+
+def _iter_deck_rows(path: str, fmt: Optional[str] = None):
+    """(en, tr) ya da hatalı satırlar için None üretir; dosyayı akış hâlinde okur."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "tsv")
+    delim = "," if fmt == "csv" else "\t"
+    strip_html = fmt == "anki"
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        first = f.readline()
+        while first.startswith("#"):   # Anki başlıkları: #separator:tab, #html:true ...
+            k, _, v = first[1:].strip().partition(":")
+            if k == "separator":
+                delim = _ANKI_SEPARATORS.get(v.strip().lower(), v.strip()[:1] or delim)
+            elif k == "html":
+                strip_html = v.strip().lower() == "true"
+            first = f.readline()
+        for n, row in enumerate(csv.reader(itertools.chain([first], f), delimiter=delim)):
+            if not row or not any(x.strip() for x in row):
+                continue
+            if len(row) < 2:
+                yield None; continue
+            en, tr = row[0], row[1]
+            if strip_html:
+                en = html.unescape(_html_tag_re.sub("", en)); tr = html.unescape(_html_tag_re.sub("", tr))
+            en, tr = en.strip(), tr.strip()
+            if n == 0 and normalize(en) in _HEADER_WORDS:
+                continue
+            yield (en, tr) if en and tr else None
+
+def import_deck(data, path: str, fmt: Optional[str] = None) -> dict:
+    cards = data["cards"]
+    idx = deck_key_index(cards)
+    start = len(cards)
+    edited = set()
+    counts = {"added": 0, "merged": 0, "duplicate": 0, "skipped": 0}
+    for row in _iter_deck_rows(path, fmt):
+        if row is None:
+            counts["skipped"] += 1; continue
+        i = idx.find(row[0])
+        status = _upsert_card(data, row[0], row[1], idx, journal=False)
+        counts[status] += 1
+        if status == "merged" and i < start:
+            edited.add(i)
+    recs = [{"op": "add", "card": c} for c in cards[start:]] + \
+           [{"op": "edit", "i": i, "tr": cards[i]["tr"]} for i in sorted(edited)]
+    if recs:
+        _commit_bulk(data, recs)
+    return counts
+
+def export_deck(data, path: str, fmt: Optional[str] = None) -> int:
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "tsv")
+    fd, tmp = _mkstemp_like(path)
+    n = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            if fmt == "anki":
+                f.write("#separator:tab\n#html:false\n")
+            w = csv.writer(f, delimiter="," if fmt == "csv" else "\t", lineterminator="\n")
+            if fmt == "csv":
+                w.writerow(["en", "tr"])
+            for c in data["cards"]:
+                w.writerow([c["en"], c["tr"]]); n += 1
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return n
+
+def import_menu(data):
+    path = input("Dosya yolu (.csv / .tsv / Anki .txt): ").strip().strip('"')
+    if not os.path.exists(path):
+        print("Dosya bulunamadı."); return
+    fmt = "anki" if path.lower().endswith(".txt") else None
+    c = import_deck(data, path, fmt)
+    print(f"✓ Eklendi: {c['added']} | Birleştirildi: {c['merged']} | "
+          f"Zaten var: {c['duplicate']} | Hatalı satır: {c['skipped']}")
+
+def export_menu(data):
+    path = input("Hedef dosya (.csv / .tsv / Anki .txt): ").strip().strip('"')
+    if not path:
+        return
+    fmt = "anki" if path.lower().endswith(".txt") else None
+    print(f"✓ {export_deck(data, path, fmt)} kart yazıldı: {path}")
+
+# ---------- Çevrimdışı sözlük araması ----------
+# "bu ne demek / çevir / translate" önce desteye bakar: her kartın "en" ve
+# ";" ile ayrılmış her "tr" karşılığı normalize edilip iki yönlü bir
+# sözlükte tutulur. Yalnızca tam eşleşme ağ isteğinin yerine geçer; önek, o da
+# yoksa bulanık (ekle/sil mesafesi) eşleşmeler çevirinin yanında öneri olarak
+# gösterilir. Dizin kart eklendikçe/karşılık katıldıkça artımlı güncellenir.
+LOOKUP_MAX_HITS = 3
+
+class LookupIndex:
+    def __init__(self, cards):
+        self.cards = cards
+        self.n = 0
+        self.keys = {"en": {}, "tr": {}}      # yan -> normalize(metin) -> [sıra]
+        self.sorted = {"en": [], "tr": []}    # önek araması için sıralı anahtarlar
+        self.sync()
+
+    def _add(self, side: str, text: str, i: int):
+        k = normalize(text)
+        if not k:
+            return
+        hits = self.keys[side].get(k)
+        if hits is None:
+            self.keys[side][k] = [i]
+            bisect.insort(self.sorted[side], k)
+        elif i not in hits:
+            hits.append(i)
+
+    def reindex(self, i: int):
+        c = self.cards[i]
+        self._add("en", c["en"], i)
+        for alt in _variant_re.split(c["tr"]):
+            self._add("tr", alt, i)
+
+    def sync(self):
+        for i in range(self.n, len(self.cards)):
+            self.reindex(i)
+        self.n = len(self.cards)
+
+    def _prefix(self, side: str, q: str) -> list:
+        keys = self.sorted[side]
+        j = bisect.bisect_left(keys, q)
+        out = []
+        while j < len(keys) and keys[j].startswith(q) and len(out) < LOOKUP_MAX_HITS:
+            out.append(keys[j]); j += 1
+        return out
+
+    def _fuzzy(self, side: str, q: str) -> list:
+        scored = []
+        slack = 1.0 - MATCH_THRESHOLD
+        for key in self.keys[side]:
+            k = int(slack * (len(q) + len(key)) + 1e-9)
+            if abs(len(q) - len(key)) <= k and _indel_within(q, key, k):
+                scored.append((abs(len(q) - len(key)), key))
+        return [key for _, key in sorted(scored)[:LOOKUP_MAX_HITS]]
+
+    def _show(self, side: str, key: str) -> str:
+        other = "en" if side == "tr" else "tr"
+        return "; ".join(dict.fromkeys(self.cards[i][other] for i in self.keys[side][key]))
+
+    def lookup(self, text: str, dest: str) -> Optional[str]:
+        """dest diline çeviriyi desteden bulur (tam eşleşme); bulamazsa None."""
+        q = normalize(text)
+        side = "tr" if dest == "en" else "en"     # aranan metnin dili
+        return self._show(side, q) if q and q in self.keys[side] else None
+
+    def suggest(self, text: str, dest: str) -> list:
+        """Tam eşleşme yoksa benzer kartlar: önek, o da yoksa bulanık ["anahtar → çeviri"]."""
+        q = normalize(text)
+        if not q:
+            return []
+        side = "tr" if dest == "en" else "en"
+        found = self._prefix(side, q) if len(q) >= 3 else []
+        if not found:
+            found = self._fuzzy(side, q)
+        return [f"{key} → {self._show(side, key)}" for key in found]
+
+_lookup_indexes = _index_registry()   # id(cards) -> LookupIndex
+
+def lookup_index(cards) -> LookupIndex:
+    return _deck_index(_lookup_indexes, LookupIndex, cards)
+
+def translate_query(qtext: str, deck=None):
+    """(çeviri, hedef dil, kaynak, öneriler): destede tam eşleşme varsa "deck",
+    yoksa translate_text ("net") ve destedeki benzer kartlar öneri olarak.
+    Türkçe harf içermeyen Türkçe kelimeler için destenin iki yanına da bakılır."""
+    dest = "en" if re.search(r"[ğüşöçıİĞÜŞÖÇ]", qtext) else "tr"
+    deck = deck if deck is not None else load_data()
+    idx = lookup_index(deck["cards"])
+    sides = (dest, "tr" if dest == "en" else "en")
+    for d in sides:
+        hit = idx.lookup(qtext, d)
+        if hit is not None:
+            LATENCY.event("çeviri:deste")
+            return hit, d, "deck", []
+    tips = [t for d in sides for t in idx.suggest(qtext, d)][:LOOKUP_MAX_HITS]
+    return translate_text(qtext, dest=dest), dest, "net", tips
+
+# ---------- Deste araması ----------
+# Kartların normalize edilmiş "en" ve "tr" alanları, Türkçe harfler ASCII'ye
+# katlanarak (ş→s, ı→i ...) karakter üçlülerine bölünür ve üçlü -> kart
+# sıraları ters dizininde tutulur. Sorgunun üçlülerini en çok paylaşan kartlar
+# (sorgunun kapsanma oranı, eşitlikte kısa kart önce) döndürülür; kısmi ve
+# yazım hatalı aramalar da bulunur. Dizin eklenen/düzenlenen kartlarla artımlı
+# güncellenir.
+SEARCH_GRAM = 3
+SEARCH_MIN_SCORE = 0.34
+_search_fold = str.maketrans({"ı": "i", "İ": "i", "ğ": "g", "Ğ": "g", "ş": "s", "Ş": "s",
+                              "ç": "c", "Ç": "c", "ö": "o", "Ö": "o", "ü": "u", "Ü": "u",
+                              "â": "a", "î": "i", "û": "u", "̇": None})
+
+def search_key(text: str) -> str:
+    return normalize(text.translate(_search_fold))
+
+def _grams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + SEARCH_GRAM] for i in range(len(padded) - SEARCH_GRAM + 1)}
+
+class SearchIndex:
+    def __init__(self, cards):
+        self.cards = cards
+        self.n = 0
+        self.postings = {}          # üçlü -> artan sıralı [sıra]
+        self.sizes = array("I")     # kart başına üçlü sayısı
+        self.sync()
+
+    def _grams_of(self, c) -> set:
+        grams = _grams(search_key(c["en"]))
+        for alt in _variant_re.split(c["tr"]):   # karşılıklar birbirine yapışmasın
+            if alt.strip():
+                grams |= _grams(search_key(alt))
+        return grams
+
+    def reindex(self, i: int):
+        grams = self._grams_of(self.cards[i])
+        if i < len(self.sizes):   # düzenlenen kart: yalnızca yeni üçlüler eklenir
+            self.sizes[i] = len(grams)
+            for g in grams:
+                post = self.postings.setdefault(g, [])
+                j = bisect.bisect_left(post, i)
+                if j == len(post) or post[j] != i:
+                    post.insert(j, i)
+            return
+        self.sizes.append(len(grams))
+        for g in grams:
+            self.postings.setdefault(g, []).append(i)
+
+    def sync(self):
+        for i in range(self.n, len(self.cards)):
+            self.reindex(i)
+        self.n = len(self.cards)
+
+    def search(self, text: str, limit: int = 10) -> list:
+        """[(puan, sıra)] — puan: sorgu üçlülerinin kartta bulunma oranı."""
+        key = search_key(text)
+        if not key:
+            return []
+        q = _grams(key)
+        hits = Counter()
+        for g in q:
+            p = self.postings.get(g)
+            if p:
+                hits.update(p)
+        nq, sizes = len(q), self.sizes
+        best = heapq.nlargest(limit, hits.items(), key=lambda kv: (kv[1], -sizes[kv[0]]))
+        return [(round(k / nq, 3), i) for i, k in best if k / nq >= SEARCH_MIN_SCORE]
+
+_search_indexes = _index_registry()   # id(cards) -> SearchIndex
+
+def search_index(cards) -> SearchIndex:
+    return _deck_index(_search_indexes, SearchIndex, cards)
+
+def search_menu(data):
+    q = input("Ara (EN/TR, kısmi olabilir): ").strip()
+    if not q:
+        return
+    t = time.perf_counter()
+    found = search_index(data["cards"]).search(q)
+    ms = (time.perf_counter() - t) * 1000
+    if not found:
+        print(f"Sonuç yok. ({ms:.1f} ms)"); return
+    print(f"\n--- '{q}' için {len(found)} sonuç ({ms:.1f} ms) ---")
+    for score, i in found:
+        c = data["cards"][i]
+        print(f"  #{i:<6} {c['en']} — {c['tr']}   (Box {c['box']}, sonraki: {c['next']}, %{score * 100:.0f})")
+
 # ---------- Quiz (Metin) ----------
 def ask_type(card, mode="mix"):
     if mode == "en2tr":
@@ -330,16 +2811,16 @@ def ask_type(card, mode="mix"):
     schedule(card, ok); return ok
 
 def ask_mcq(card, pool, mode="mix", k=4):
-    others = [c for c in pool if c is not card]; random.shuffle(others)
     if mode == "en2tr":
-        q, a = card["en"], card["tr"]; distractors=[c["tr"] for c in others[:k-1]]; label="(EN→TR)"
+        q, a = card["en"], card["tr"]; side="tr"; label="(EN→TR)"
     elif mode == "tr2en":
-        q, a = card["tr"], card["en"]; distractors=[c["en"] for c in others[:k-1]]; label="(TR→EN)"
+        q, a = card["tr"], card["en"]; side="en"; label="(TR→EN)"
     else:
         if random.random() < 0.5:
-            q, a = card["en"], card["tr"]; distractors=[c["tr"] for c in others[:k-1]]; label="(EN→TR)"
+            q, a = card["en"], card["tr"]; side="tr"; label="(EN→TR)"
         else:
-            q, a = card["tr"], card["en"]; distractors=[c["en"] for c in others[:k-1]]; label="(TR→EN)"
+            q, a = card["tr"], card["en"]; side="en"; label="(TR→EN)"
+    distractors = pick_distractors(pool, card, side, k-1)
     opts = distractors + [a]; random.shuffle(opts)
     print(f"{label}  Soru: {q}")
     for i,opt in enumerate(opts,1): print(f"  {i}) {opt}")
@@ -354,64 +2835,68 @@ def ask_mcq(card, pool, mode="mix", k=4):
     schedule(card, ok); return ok
 
 # ---------- Quiz (Sesli) ----------
-def ask_type_voice(card, mode="mix", tr_voice=False):
+def voice_question(card, mode="mix"):
+    """(soru, cevap, etiket, okunacak dil) — mix modunda yön burada seçilir."""
     if mode == "en2tr":
-        q, a, label, speak_lang = card["en"], card["tr"], "(EN→TR)", "en"
+        return card["en"], card["tr"], "(EN→TR)", "en"
     elif mode == "tr2en":
-        q, a, label, speak_lang = card["tr"], card["en"], "(TR→EN)", "tr"
+        return card["tr"], card["en"], "(TR→EN)", "tr"
+    if random.random() < 0.5:
+        return card["en"], card["tr"], "(EN→TR)", "en"
+    return card["tr"], card["en"], "(TR→EN)", "tr"
+
+def ask_type_voice(card, mode="mix", tr_voice=False, prep=None):
+    if prep is None:
+        q, a, label, speak_lang = voice_question(card, mode)
+        tr_show = None
     else:
-        if random.random() < 0.5:
-            q, a, label, speak_lang = card["en"], card["tr"], "(EN→TR)", "en"
-        else:
-            q, a, label, speak_lang = card["tr"], card["en"], "(TR→EN)", "tr"
+        q, a, label, speak_lang = prep["question"]; tr_show = prep["help"]
     print(f"{label}  Soru: {q}")
-    tr_show = translate_text(q, dest="tr") if speak_lang=="en" else translate_text(q, dest="en")
+    if tr_show is None:
+        tr_show = translate_text(q, dest="tr") if speak_lang=="en" else translate_text(q, dest="en")
     print("↳ Yardımcı çeviri:", tr_show)
+    prelisten()
     speak(q, lang=speak_lang)
     if tr_voice:
-        speak(tr_show, lang="tr" if speak_lang=="en" else "en")
+        speak(tr_show, lang="tr" if speak_lang=="en" else "en", priority=SPEAK_LOW)
     ans = listen(lang="en-US" if label=="(EN→TR)" else "tr-TR") or input("Cevap (boş=bilmiyorum): ")
+    SPEECH.interrupt()
     ans = ans.strip()
     if not ans:
         print(f"↳ Doğru: {a}"); schedule(card, False); return False
     qtext = extract_translate_query(ans)
     if qtext:
-        dest = "en" if re.search(r"[ğüşöçıİĞÜŞÖÇ]", qtext) else "tr"
-        translated = translate_text(qtext, dest=dest)
+        d = load_data()
+        translated, dest, source, tips = translate_query(qtext, d)
         print("Çeviri:", translated); speak(translated, "tr" if dest=="tr" else "en")
-        add = input("Sözlüğe ekleyeyim mi? (y/n): ").lower().strip()
+        if tips:
+            print("Destede benzer:", *tips, sep="\n  ")
+        add = "n" if source == "deck" else input("Sözlüğe ekleyeyim mi? (y/n): ").lower().strip()
         if add == "y":
-            d = load_data()
             if dest == "tr": en, tr = qtext, translated
             else: en, tr = translated, qtext
-            d["cards"].append({"en": en, "tr": tr, "box": 0,
-                               "next": date.today().isoformat(),
-                               "stats": {"correct": 0, "wrong": 0}})
-            save_data(d); print("✓ Sözlüğe kaydedildi.")
+            add_or_merge_card(d, en, tr); print("✓ Sözlüğe kaydedildi.")
         schedule(card, False); return False
     ok = matches(ans, a)
     print("✓ Doğru!" if ok else f"✗ Yanlış. Doğrusu: {a}")
     schedule(card, ok); return ok
 
-def ask_mcq_voice(card, pool, mode="mix", k=4, tr_voice=False):
-    others = [c for c in pool if c is not card]; random.shuffle(others)
-    if mode == "en2tr":
-        q, a = card["en"], card["tr"]; distractors=[c["tr"] for c in others[:k-1]]; label="(EN→TR)"; sl="en"
-    elif mode == "tr2en":
-        q, a = card["tr"], card["en"]; distractors=[c["en"] for c in others[:k-1]]; label="(TR→EN)"; sl="tr"
+def ask_mcq_voice(card, pool, mode="mix", k=4, tr_voice=False, prep=None):
+    if prep is None:
+        q, a, label, sl = voice_question(card, mode)
+        tr_show = None
     else:
-        if random.random() < 0.5:
-            q, a, sl, label = card["en"], card["tr"], "en", "(EN→TR)"
-        else:
-            q, a, sl, label = card["tr"], card["en"], "tr", "(TR→EN)"
-        distractors = [ (c["tr"] if sl=="en" else c["en"]) for c in others[:k-1] ]
+        (q, a, label, sl), tr_show = prep["question"], prep["help"]
+    distractors = pick_distractors(pool, card, "tr" if sl=="en" else "en", k-1)
     opts = distractors + [a]; random.shuffle(opts)
     print(f"{label}  Soru: {q}")
-    tr_show = translate_text(q, dest="tr" if sl=="en" else "en")
+    if tr_show is None:
+        tr_show = translate_text(q, dest="tr" if sl=="en" else "en")
     print("↳ Yardımcı çeviri:", tr_show)
+    prelisten(phrase_time_limit=3.0)
     speak(q, lang=sl)
     if tr_voice:
-        speak(tr_show, lang="tr" if sl=="en" else "en")
+        speak(tr_show, lang="tr" if sl=="en" else "en", priority=SPEAK_LOW)
     for i,opt in enumerate(opts,1): print(f"  {i}) {opt}")
     heard = listen(lang="tr-TR", phrase_time_limit=3.0)
     if heard:
@@ -422,6 +2907,7 @@ def ask_mcq_voice(card, pool, mode="mix", k=4, tr_voice=False):
         choice = None
     if not choice:
         choice = input(f"Seçimin (1-{len(opts)}) / Enter=bilmiyorum: ").strip()
+    SPEECH.interrupt()
     if not choice:
         print(f"↳ Doğru: {a}"); schedule(card, False); return False
     try:
@@ -431,6 +2917,67 @@ def ask_mcq_voice(card, pool, mode="mix", k=4, tr_voice=False):
     print("✓ Doğru!" if ok else f"✗ Yanlış. Doğrusu: {a}")
     schedule(card, ok); return ok
 
+# ---------- Önden hazırlık (prefetch) ----------
+# Sesli çalışmada sıradaki VOICE_PREFETCH_DEPTH kartın yardımcı çevirisi ve
+# (Edge TTS kullanılacaksa) ses dosyası, mevcut kart cevaplanırken arka planda
+# hazırlanır; speak() sonra aynı dosyayı önbellekten çalar.
+VOICE_PREFETCH_DEPTH = 2
+VOICE_PREFETCH_WORKERS = 2
+
+class VoicePrefetcher:
+    def __init__(self, cards, mode="mix", tr_voice=False,
+                 depth: int = VOICE_PREFETCH_DEPTH, workers: int = VOICE_PREFETCH_WORKERS):
+        self.cards = cards
+        self.mode = mode
+        self.tr_voice = tr_voice
+        self.depth = max(0, depth)
+        self.cancelled = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self.futures = {}
+        # pyttsx3 motoru thread-safe değil: hangi dillerin Edge'e düşeceğine burada karar ver
+        self.edge = {"en": speech_uses_edge("en"), "tr": speech_uses_edge("tr")}
+
+    def _synth(self, text: str, lang: str):
+        if self.cancelled.is_set() or not self.edge[lang]:
+            return
+        try:
+            asyncio.run(edge_tts_fetch(text, _edge_voices(lang)))
+        except Exception:
+            pass  # çalma anında speak() yeniden dener
+
+    def _prepare(self, question):
+        q, _, _, lang = question
+        other = "tr" if lang == "en" else "en"
+        self._synth(q, lang)
+        if self.cancelled.is_set():
+            return None
+        help_text = translate_text(q, dest=other)
+        if self.tr_voice:
+            self._synth(help_text, other)
+        return {"question": question, "help": help_text}
+
+    def _submit(self, i: int):
+        if i < len(self.cards) and i not in self.futures and not self.cancelled.is_set():
+            question = voice_question(self.cards[i], self.mode)
+            self.futures[i] = self.pool.submit(self._prepare, question)
+
+    def get(self, i: int):
+        """i. kartın hazırlığını döndürür ve sonraki kartları kuyruğa alır."""
+        for j in range(i, i + self.depth + 1):
+            self._submit(j)
+        fut = self.futures.pop(i, None)
+        try:
+            return fut.result() if fut is not None else None
+        except Exception:
+            return None
+
+    def close(self):
+        self.cancelled.set()
+        for fut in self.futures.values():
+            fut.cancel()
+        self.futures.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
 # ---------- Study flows ----------
 def study_text(data):
     cards = data["cards"]
@@ -440,12 +2987,13 @@ def study_text(data):
     mode = {1:"en2tr",2:"tr2en",3:"mix"}[input_int("Seçim: ",1,3)]
     print("1) Yazmalı   2) Çoktan seçmeli (MCQ)")
     style = {1:"type",2:"mcq"}[input_int("Seçim: ",1,2)]
-    due = due_cards(cards) or cards[:]; random.shuffle(due)
+    due = session_cards(data)
     total=len(due); correct=0
     for i,card in enumerate(due,1):
         print(f"\n[{i}/{total}] {'-'*40}")
         ok = ask_type(card, mode) if style=="type" else ask_mcq(card, cards, mode, 4)
-        correct += int(ok); save_data(data)
+        correct += int(ok); record_review(data, card)
+    compact_data(data)
     print(f"\nOturum bitti. Doğru: {correct}/{total}")
     show_stats(data)
 
@@ -458,15 +3006,23 @@ def study_voice(data):
     tr_voice = input("Sorular Türkçe de okunsun mu? (e/h): ").strip().lower().startswith("e")
     print("1) Yazmalı benzeri  2) Çoktan seçmeli (sesle numara seçimi destekli)")
     style = {1:"type",2:"mcq"}[input_int("Seçim: ",1,2)]
-    due = due_cards(cards) or cards[:]; random.shuffle(due)
+    due = session_cards(data)
     total=len(due); correct=0
-    for i,card in enumerate(due,1):
-        print(f"\n[{i}/{total}] {'-'*40}")
-        if style=="type":
-            ok = ask_type_voice(card, mode, tr_voice=tr_voice)
-        else:
-            ok = ask_mcq_voice(card, cards, mode, 4, tr_voice=tr_voice)
-        correct += int(ok); save_data(data)
+    prefetch = VoicePrefetcher(due, mode, tr_voice)
+    try:
+        with mic_session():
+            for i,card in enumerate(due,1):
+                print(f"\n[{i}/{total}] {'-'*40}")
+                prep = prefetch.get(i-1)
+                if style=="type":
+                    ok = ask_type_voice(card, mode, tr_voice=tr_voice, prep=prep)
+                else:
+                    ok = ask_mcq_voice(card, cards, mode, 4, tr_voice=tr_voice, prep=prep)
+                correct += int(ok); record_review(data, card)
+    finally:
+        prefetch.close()
+        dump_latency()
+    compact_data(data)
     print(f"\nOturum bitti. Doğru: {correct}/{total}")
     show_stats(data)
 
@@ -491,6 +3047,102 @@ def input_int(prompt, low, high):
             pass
         print(f"Lütfen {low}-{high} arasında bir sayı girin.")
 
+# ---------- Kelime analizi (konuşma) ----------
+# Her kullanıcı kaydında "vocab" (kelime -> sayı) ve "tokens" tutulur; her
+# yanıtta yalnızca o yanıtın kelimeleri işlenir. Tür/örnek oranı, yeni
+# kelime oranı ve deste kapsamı (destedeki İngilizce kelimelerden kaçının
+# kullanıldığı) geçmiş taranmadan güncellenir. Kapsam sayacı bellekte tutulur;
+# deste büyüdükçe yalnızca yeni deste kelimeleri kontrol edilir.
+_token_re = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+def tokenize_en(text: str) -> list:
+    return _token_re.findall(text.lower())
+
+class DeckVocab:
+    def __init__(self, cards):
+        self.cards = cards
+        self.n = 0
+        self.words = set()
+        self.order = []     # eklenme sırasıyla deste kelimeleri
+        self.sync()
+
+    def reindex(self, i: int):
+        for t in tokenize_en(self.cards[i]["en"]):
+            if t not in self.words:
+                self.words.add(t); self.order.append(t)
+
+    def sync(self):
+        for i in range(self.n, len(self.cards)):
+            self.reindex(i)
+        self.n = len(self.cards)
+
+_deck_vocabs = _index_registry()   # id(cards) -> DeckVocab
+
+def deck_vocab(cards) -> DeckVocab:
+    return _deck_index(_deck_vocabs, DeckVocab, cards)
+
+class _Coverage:
+    __slots__ = ("user", "dv", "covered", "seen")
+
+    def __init__(self, user: dict, dv: DeckVocab):
+        vocab = user_vocab(user)
+        self.user, self.dv = user, dv
+        self.covered = sum(1 for t in dv.order if t in vocab)
+        self.seen = len(dv.order)
+
+    def value(self) -> int:
+        vocab = self.user["vocab"]
+        for t in self.dv.order[self.seen:]:
+            self.covered += t in vocab
+        self.seen = len(self.dv.order)
+        return self.covered
+
+_coverages = {}   # (id(kullanıcı), id(DeckVocab)) -> _Coverage
+
+def _coverage(u: dict, dv: DeckVocab) -> _Coverage:
+    cov = _coverages.get((id(u), id(dv)))
+    if cov is None or cov.user is not u or cov.dv is not dv:
+        cov = _coverages[(id(u), id(dv))] = _Coverage(u, dv)
+    return cov
+
+def user_vocab(u: dict) -> dict:
+    if not isinstance(u.get("vocab"), dict):
+        u["vocab"] = {}; u["tokens"] = 0
+    return u["vocab"]
+
+def record_vocab(u: dict, session: dict, text: str, cards) -> int:
+    """Yanıtın kelimelerini sayaçlara katar; yeni kelime sayısını döndürür."""
+    toks = tokenize_en(text)
+    vocab = user_vocab(u)
+    dv = deck_vocab(cards)
+    cov = _coverage(u, dv)
+    cov.value()
+    new = 0
+    for t in toks:
+        n = vocab.get(t, 0)
+        if not n:
+            new += 1
+            if t in dv.words:
+                cov.covered += 1
+        vocab[t] = n + 1
+    u["tokens"] += len(toks)
+    session["tokens"] = session.get("tokens", 0) + len(toks)
+    session["new_words"] = session.get("new_words", 0) + new
+    return new
+
+def vocab_stats(u: dict, session: dict, cards) -> dict:
+    vocab = user_vocab(u)
+    dv = deck_vocab(cards)
+    tokens, stoks = u["tokens"], session.get("tokens", 0)
+    covered = _coverage(u, dv).value()
+    return {"types": len(vocab), "tokens": tokens,
+            "ttr": round(len(vocab) / tokens, 3) if tokens else 0.0,
+            "session_new_words": session.get("new_words", 0),
+            "new_word_rate": round(session.get("new_words", 0) / stoks, 3) if stoks else 0.0,
+            "deck_words": len(dv.words), "deck_covered": covered,
+            "deck_coverage": round(covered / len(dv.words), 3) if dv.words else 0.0,
+            "top": heapq.nlargest(5, vocab, key=vocab.get)}
+
 def user_rec(users, name):
     u = users["users"].get(name.lower())
     if not u:
@@ -498,18 +3150,7 @@ def user_rec(users, name):
         users["users"][name.lower()] = u
     return u
 
-def load_users():
-    if not os.path.exists(USER_DATA):
-        with open(USER_DATA, "w", encoding="utf-8") as f:
-            json.dump({"users": {}, "vocab": []}, f, ensure_ascii=False, indent=2)
-    with open(USER_DATA, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_users(u):
-    with open(USER_DATA, "w", encoding="utf-8") as f:
-        json.dump(u, f, ensure_ascii=False, indent=2)
-
-def show_two_stats(users, name, session):
+def show_two_stats(users, name, session, deck=None):
     u = user_rec(users, name)
     print("\n--- Oturum İstatistikleri ---")
     print(f"Sorulan soru : {session['questions']}")
@@ -524,75 +3165,506 @@ def show_two_stats(users, name, session):
     avg2 = u['words']/max(1,u['turns'])
     print(f"Ort. kelime/yanıt: {avg2:.1f}")
     print(f"Son görüldüğü: {u['last_seen']}")
+    v = vocab_stats(u, session, (deck if deck is not None else load_data())["cards"])
+    print("\n--- Kelime Dağarcığı ---")
+    print(f"Farklı kelime : {v['types']}  (toplam {v['tokens']})")
+    print(f"Tür/örnek oranı: {v['ttr']:.2f}")
+    print(f"Bu oturumda yeni: {v['session_new_words']}  (oran {v['new_word_rate']:.0%})")
+    print(f"Deste kapsamı : {v['deck_covered']}/{v['deck_words']} ({v['deck_coverage']:.0%})")
+    if v["top"]:
+        print("En sık        :", ", ".join(v["top"]))
 
-def conversation_b1(username: str):
-    users = load_users()
+def start_conversation(users, username: str):
     u = user_rec(users, username)
     u["sessions"] += 1
     u["last_seen"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-    save_users(users)
+    return u
+
+def translate_step(user_s: str, deck=None) -> Optional[dict]:
+    """Çeviri isteğiyse cevabını döndürür, değilse None. Kullanıcı kaydına
+    dokunmaz; sunucu ağ isteğini kullanıcı kilidi dışında yapabilsin diye ayrı."""
+    if user_s.lower().startswith("add:"):
+        return None
+    qtext = extract_translate_query(user_s)
+    if not qtext:
+        return None
+    reply, dest, _, tips = translate_query(qtext, deck)
+    return {"kind": "translate", "reply": reply, "lang": dest, "suggestions": tips}
+
+def conversation_step(users, username: str, session, user_s: str, deck=None) -> dict:
+    """Bir konuşma girdisini işler (CLI ve sunucu ortak). Kaydetmez; "answer"
+    türünde kullanıcı kaydı değiştiği için çağıran touch_user yapmalıdır."""
+    u = user_rec(users, username)
+    low = user_s.lower()
+    if low in ("quit","exit","q"):
+        return {"kind": "quit", "reply": "Great job today. See you next time!", "lang": "en"}
+    if low in ("istatistikleri göster","show stats","stats"):
+        return {"kind": "stats"}
+    if low.startswith("add:"):
+        m = re.match(r"add:\s*(.+?)\s*=\s*(.+)", user_s, flags=re.I)
+        if not m:
+            return {"kind": "error", "reply": "Biçim: add: english = türkçe"}
+        vocab = deck if deck is not None else load_data()
+        status = add_or_merge_card(vocab, m.group(1).strip(), m.group(2).strip())
+        return {"kind": "add", "reply": "✓ Eklendi." if status != "duplicate" else "Zaten sözlükte."}
+    step = translate_step(user_s, deck)
+    if step is not None:
+        return step
+
+    wc = len(user_s.split())
+    session["answers"] += 1; session["words"] += wc
+    u["turns"] += 1; u["words"] += wc
+    record_vocab(u, session, user_s, (deck if deck is not None else load_data())["cards"])
+
+    fb = "Daha fazla detay ekleyebilirsin." if wc<8 else ("Güzel ve anlaşılır." if wc<20 else "Harika, detaylı!")
+    return {"kind": "answer", "reply": fb, "lang": "tr", "words": wc}
+
+def conversation_b1(username: str):
+    users = load_users()
+    translate_many(QUESTIONS_B1, "tr")  # soruların çevirilerini tek istekte önbelleğe al
+    start_conversation(users, username)
+    touch_user(users, username)
 
     greet = f"Hi {username}! We'll practice speaking. I'll also show Turkish translations."
     print("🤖:", greet); speak(greet, "en")
 
-    session = {"questions":0,"answers":0,"words":0}
+    session = {"questions":0,"answers":0,"words":0,"tokens":0,"new_words":0}
     print("Komutlar: quit | istatistikleri göster | add: en = tr | bu ne demek/çevir/translate ...")
 
+    try:
+        with mic_session():
+            _conversation_loop(users, username, session)
+    finally:
+        flush_users()
+        dump_latency()
+
+def _conversation_loop(users, username: str, session):
     while True:
         q = random.choice(QUESTIONS_B1)
         tr_q = translate_text(q, dest="tr")
         print("\n🤖 Question:", q, "\n↳ Türkçe:", tr_q)
-        speak(q, "en"); speak(tr_q, "tr")
+        prelisten(phrase_time_limit=45.0)
+        speak(q, "en"); speak(tr_q, "tr", priority=SPEAK_LOW)
         session["questions"] += 1
 
         user = listen("en-US", phrase_time_limit=45.0) or input("Cevabınız: ")
+        SPEECH.interrupt()
         user_s = user.strip()
         print("🧑:", user_s if user_s else "(boş)")
 
-        low = user_s.lower()
-        if low in ("quit","exit","q"):
-            bye = "Great job today. See you next time!"
-            print("🤖:", bye); speak(bye, "en"); break
-        if low in ("istatistikleri göster","show stats","stats"):
+        step = conversation_step(users, username, session, user_s)
+        kind, reply = step["kind"], step.get("reply")
+        if kind == "quit":
+            print("🤖:", reply); speak(reply, "en", wait=True); break
+        if kind == "stats":
             show_two_stats(users, username, session); continue
-        if low.startswith("add:"):
-            m = re.match(r"add:\s*(.+?)\s*=\s*(.+)", user_s, flags=re.I)
-            if m:
-                vocab = load_data()
-                vocab["cards"].append({"en": m.group(1).strip(), "tr": m.group(2).strip(),
-                                       "box":0,"next":date.today().isoformat(),
-                                       "stats":{"correct":0,"wrong":0}})
-                save_data(vocab); print("✓ Eklendi.")
-            else:
-                print("Biçim: add: english = türkçe")
+        if kind in ("add", "error"):
+            print(reply); continue
+        if kind == "translate":
+            print("Çeviri:", reply); speak(reply, step["lang"])
+            if step["suggestions"]:
+                print("Destede benzer:", *step["suggestions"], sep="\n  ")
             continue
-        qtext = extract_translate_query(user_s)
-        if qtext:
-            dest = "en" if re.search(r"[ğüşöçıİĞÜŞÖÇ]", qtext) else "tr"
-            translated = translate_text(qtext, dest=dest)
-            print("Çeviri:", translated); speak(translated, "tr" if dest=="tr" else "en")
-            continue
-
-        wc = len(user_s.split())
-        session["answers"] += 1; session["words"] += wc
-        u["turns"] += 1; u["words"] += wc; save_users(users)
 
-        fb = "Daha fazla detay ekleyebilirsin." if wc<8 else ("Güzel ve anlaşılır." if wc<20 else "Harika, detaylı!")
-        print("🤖:", fb); speak(fb, "tr")
+        touch_user(users, username)
+        print("🤖:", reply); speak(reply, "tr")
 
 # ---------- Reset ----------
 def reset_progress(data):
-    for c in data["cards"]:
-        c["box"] = 0
-        c["next"] = date.today().isoformat()
-        c["stats"] = {"correct": 0, "wrong": 0}
-    save_data(data); print("✓ İlerleme sıfırlandı.")
+    today = date.today().isoformat()
+    _reset_cards(data["cards"], today)
+    deck_agg(data).reset(len(data["cards"]), today)
+    due_queue(data).reset(today)
+    _journal_append(data, {"op": "reset", "next": today}); print("✓ İlerleme sıfırlandı.")
+
+# ---------- Sunucu (çok kullanıcılı) ----------
+# `python <betik> --serve [port]` ile asyncio tabanlı bir HTTP/JSON sunucusu
+# açılır. Her öğrencinin destesi USER_DECK_DIR altında ayrı bir dosyadadır ve
+# kullanıcı başına bir kilitle sıralanır; çeviri/ses önbellekleri ve
+# kullanıcı istatistikleri süreç içinde paylaşılır. Yavaş işler (deste
+# yükleme, çeviri, dosya yazma) thread'e aktarılır, olay döngüsü bloklanmaz.
+#
+#   GET  /health
+#   GET  /users/<ad>/due?limit=20          -> due kartlar (id = destedeki sıra)
+#   GET  /users/<ad>/mcq?id=3&direction=en2tr&k=4
+#   POST /users/<ad>/answer   {"id", "answer", "direction"}
+#   POST /users/<ad>/cards    {"en", "tr"}
+#   GET  /users/<ad>/stats
+#   GET  /users/<ad>/search?q=...&limit=10
+#   GET  /users/<ad>/forecast?days=30
+#   POST /users/<ad>/conversation/start
+#   POST /users/<ad>/conversation/turn   {"text"}
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+USER_DECK_DIR = "decks"
+SERVER_MAX_BODY = 1 << 20
+
+_HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+def learner_key(name: str) -> str:
+    """Öğrenci adından dosya adı olarak güvenli anahtar ("" = geçersiz)."""
+    return re.sub(r"[^\w-]", "_", name.strip().lower())
+
+def learner_deck_path(key: str, deck_dir: str = USER_DECK_DIR) -> str:
+    os.makedirs(deck_dir, exist_ok=True)
+    return os.path.join(deck_dir, key + (".db" if STORAGE == "sqlite" else ".json"))
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _card_json(i: int, c: dict) -> dict:
+    return {"id": i, "en": c["en"], "tr": c["tr"], "box": c["box"], "next": c["next"],
+            "stats": dict(c["stats"])}
+
+def _deck_stats(data) -> dict:
+    agg = deck_agg(data)
+    return {"total": agg.n, "due": agg.due(), "correct": agg.correct, "wrong": agg.wrong,
+            "by_box": {str(k): v for k, v in sorted(agg.box.items())}}
+
+class StudyServer:
+    def __init__(self, deck_dir: str = USER_DECK_DIR):
+        self.deck_dir = deck_dir
+        self.locks = {}         # kullanıcı anahtarı -> asyncio.Lock
+        self.decks = {}         # kullanıcı anahtarı -> data
+        self.sessions = {}      # kullanıcı anahtarı -> konuşma oturumu
+        self.users = None
+        self.users_lock = asyncio.Lock()
+
+    @staticmethod
+    def user_key(name: str) -> str:
+        key = learner_key(name)
+        if not key:
+            raise HttpError(400, "kullanıcı adı boş")
+        return key
+
+    def lock(self, key: str) -> asyncio.Lock:
+        if key not in self.locks:
+            self.locks[key] = asyncio.Lock()
+        return self.locks[key]
+
+    async def deck(self, key: str):
+        """Kullanıcının destesi; çağıran self.lock(key)'i tutmalıdır."""
+        if key not in self.decks:
+            path = learner_deck_path(key, self.deck_dir)
+            self.decks[key] = await asyncio.to_thread(load_data, path)
+        return self.decks[key]
+
+    async def _users(self):
+        if self.users is None:
+            self.users = await asyncio.to_thread(load_users)
+        return self.users
+
+    # --- uç noktalar ---
+    @staticmethod
+    def _card(data, body_or_query) -> tuple:
+        try:
+            i = int(body_or_query.get("id"))
+            if i < 0:
+                raise IndexError(i)
+            return i, data["cards"][i]
+        except (TypeError, ValueError, IndexError):
+            raise HttpError(404, "kart bulunamadı")
+
+    @staticmethod
+    def _int(query, name: str, default: int) -> int:
+        try:
+            return int(query.get(name, default))
+        except (TypeError, ValueError):
+            raise HttpError(400, f"{name} sayı olmalı")
+
+    @staticmethod
+    def _direction(card, direction) -> tuple:
+        if direction == "tr2en":
+            return card["tr"], card["en"], "en"
+        if direction in (None, "en2tr"):
+            return card["en"], card["tr"], "tr"
+        raise HttpError(400, "direction en2tr ya da tr2en olmalı")
+
+    async def forecast(self, key, query, body):
+        days = max(1, min(self._int(query, "days", FORECAST_DAYS), 365))
+        async with self.lock(key):
+            data = await self.deck(key)
+            fc = review_forecast(data["cards"], days)
+        start = date.today().toordinal()
+        return {"forecast": [{"date": _iso_of(start + k), "reviews": n} for k, n in enumerate(fc)]}
+
+    async def search(self, key, query, body):
+        limit = max(1, min(self._int(query, "limit", 10), 100))
+        async with self.lock(key):
+            data = await self.deck(key)
+            found = search_index(data["cards"]).search(str(query.get("q", "")), limit)
+            return {"results": [dict(_card_json(i, data["cards"][i]), score=score) for score, i in found]}
+
+    async def due(self, key, query, body):
+        limit = self._int(query, "limit", 20)
+        async with self.lock(key):
+            data = await self.deck(key)
+            pos = due_queue(data).due(cap=max(0, limit))
+            return {"due": [_card_json(i, data["cards"][i]) for i in pos]}
+
+    async def mcq(self, key, query, body):
+        async with self.lock(key):
+            data = await self.deck(key)
+            i, card = self._card(data, query)
+            q, a, side = self._direction(card, query.get("direction"))
+            opts = pick_distractors(data["cards"], card, side, self._int(query, "k", 4) - 1) + [a]
+            random.shuffle(opts)
+            return {"id": i, "question": q, "options": opts}
+
+    async def answer(self, key, query, body):
+        async with self.lock(key):
+            data = await self.deck(key)
+            i, card = self._card(data, body)
+            _, a, _ = self._direction(card, body.get("direction"))
+            ans = str(body.get("answer") or "").strip()
+            ok = bool(ans) and matches(ans, a)
+            schedule(card, ok)
+            await asyncio.to_thread(record_review, data, card)   # günlük yazımı
+            return {"id": i, "correct": ok, "expected": a, "box": card["box"], "next": card["next"]}
+
+    async def add_card(self, key, query, body):
+        en, tr = str(body.get("en") or "").strip(), str(body.get("tr") or "").strip()
+        if not en or not tr:
+            raise HttpError(400, "en ve tr gerekli")
+        async with self.lock(key):
+            data = await self.deck(key)
+            status = await asyncio.to_thread(add_or_merge_card, data, en, tr)
+            return {"id": deck_key_index(data["cards"]).find(en), "status": status}
+
+    async def stats(self, key, query, body):
+        async with self.lock(key):
+            data = await self.deck(key)
+            return _deck_stats(data)
+
+    async def _next_question(self, key) -> dict:
+        q = random.choice(QUESTIONS_B1)
+        self.sessions[key]["questions"] += 1
+        return {"question": q, "translation": await asyncio.to_thread(translate_text, q, "tr")}
+
+    async def conversation_start(self, key, query, body):
+        name = str(body.get("name") or key)
+        async with self.users_lock:
+            users = await self._users()
+            start_conversation(users, key)["name"] = name   # kayıt anahtarı key, ad yalnızca görünen ad
+            touch_user(users, key)
+        self.sessions[key] = {"questions": 0, "answers": 0, "words": 0, "tokens": 0, "new_words": 0}
+        greet = f"Hi {name}! We'll practice speaking. I'll also show Turkish translations."
+        return dict({"reply": greet}, **await self._next_question(key))
+
+    async def conversation_turn(self, key, query, body):
+        if key not in self.sessions:
+            raise HttpError(400, "önce /conversation/start çağırın")
+        session = self.sessions[key]
+        text = str(body.get("text") or "").strip()
+        async with self.lock(key):
+            deck = await self.deck(key)
+            # çeviri ağa gidebilir: ortak kullanıcı kilidi dışında yapılır
+            step = await asyncio.to_thread(translate_step, text, deck)
+            if step is None:
+                async with self.users_lock:
+                    users = await self._users()
+                    step = await asyncio.to_thread(conversation_step, users, key, session, text, deck)
+                    if step["kind"] == "answer":
+                        touch_user(users, key)
+                    if step["kind"] == "stats":
+                        u = user_rec(users, key)
+                        step["session"] = dict(session)
+                        step["user"] = {k: v for k, v in u.items() if k != "vocab"}
+                        step["vocab"] = vocab_stats(u, session, deck["cards"])
+        if step["kind"] == "quit":
+            self.sessions.pop(key, None)
+            return step
+        return dict(step, **await self._next_question(key))
+
+    ROUTES = {
+        ("GET", "due"): "due", ("GET", "mcq"): "mcq", ("POST", "answer"): "answer",
+        ("POST", "cards"): "add_card", ("GET", "stats"): "stats", ("GET", "search"): "search",
+        ("GET", "forecast"): "forecast",
+        ("POST", "conversation/start"): "conversation_start",
+        ("POST", "conversation/turn"): "conversation_turn",
+    }
+
+    async def dispatch(self, method: str, target: str, body: dict) -> dict:
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+        if parts == ["health"]:
+            return {"ok": True}
+        if len(parts) < 3 or parts[0] != "users":
+            raise HttpError(404, "bilinmeyen yol")
+        handler = self.ROUTES.get((method, "/".join(parts[2:])))
+        if handler is None:
+            raise HttpError(404 if method in ("GET", "POST") else 405, "bilinmeyen yol")
+        return await getattr(self, handler)(self.user_key(parts[1]), query, body)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                try:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                        if length < 0:
+                            raise ValueError(length)
+                    except ValueError:
+                        length = None   # gövde okunamaz: bağlantı kapatılır
+                        raise HttpError(400, "geçersiz Content-Length")
+                    if length > SERVER_MAX_BODY:
+                        raise HttpError(413, "istek gövdesi çok büyük")
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else {}
+                    except ValueError:
+                        raise HttpError(400, "geçersiz JSON")
+                    status, payload = 200, await self.dispatch(method.upper(), target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                out = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {_HTTP_REASONS.get(status, '')}\r\n"
+                              "Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(out)}\r\n"
+                              f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n").encode("latin-1") + out)
+                await writer.drain()
+                if not keep or status == 413 or length is None:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT):
+    app = StudyServer()
+    server = await asyncio.start_server(app.handle_client, host, port)
+    print(f"Sunucu dinliyor: http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+# ---------- Toplu notlandırma ----------
+# Öğretmenler için: "learner,card,answer" satırlı bir CSV tek geçişte
+# notlandırılır. card, destedeki sıra (sayı) ya da İngilizce kelimedir.
+# Eşleştirme saf bir işlem olduğundan büyük partilerde (GRADE_PARALLEL_MIN)
+# tekil (cevap, doğru) çiftleri süreç havuzuna dağıtılır; schedule() ve
+# kayıt ise öğrenci başına sırayla yapılır ve her deste tek yazımla
+# (_commit_bulk) kaydedilir. Sonuçlar satır satır bir CSV'ye yazılır.
+GRADE_PARALLEL_MIN = 50_000
+GRADE_CHUNK = 5_000
+GRADE_WORKERS = None   # None: os.cpu_count()
+
+def _grade_chunk(pairs) -> list:
+    return [matches(u, a) for u, a in pairs]
+
+def _grade_pairs(pairs: list) -> dict:
+    """{(cevap, doğru): bool}; büyük partilerde süreç havuzu kullanır."""
+    if len(pairs) < GRADE_PARALLEL_MIN:
+        return dict(zip(pairs, _grade_chunk(pairs)))
+    chunks = [pairs[i:i + GRADE_CHUNK] for i in range(0, len(pairs), GRADE_CHUNK)]
+    with ProcessPoolExecutor(max_workers=GRADE_WORKERS) as pool:
+        results = list(itertools.chain.from_iterable(pool.map(_grade_chunk, chunks)))
+    return dict(zip(pairs, results))
+
+def _resolve_card(cards, idx: DeckKeyIndex, ref: str) -> Optional[int]:
+    ref = ref.strip()
+    if ref.isdigit():
+        i = int(ref)
+        return i if i < len(cards) else None
+    return idx.find(ref)
+
+def grade_batch(in_path: str, out_path: str, deck_dir: str = USER_DECK_DIR) -> dict:
+    """CSV'yi notlandırır, SRS durumunu günceller; öğrenci başına özet döndürür.
+    Destesi olmayan öğrencilerin satırları "unknown_learner" olarak raporlanır
+    (yazım hatalı bir ad için yeni deste açılmaz)."""
+    rows = []   # (öğrenci anahtarı, card, cevap)
+    with open(in_path, "r", encoding="utf-8-sig", newline="") as f:
+        for n, row in enumerate(csv.reader(f)):
+            if len(row) < 3 or (n == 0 and row[0].strip().lower() == "learner"):
+                continue
+            key = learner_key(row[0])
+            if key:
+                rows.append((key, row[1], row[2]))
+
+    decks, places, missing = {}, [], set()
+    for key, ref, _ in rows:
+        if key not in decks and key not in missing:
+            path = learner_deck_path(key, deck_dir)
+            if path in _open_paths or os.path.exists(path):
+                data = load_data(path)
+                decks[key] = (data, deck_key_index(data["cards"]))
+            else:
+                missing.add(key)
+        if key in missing:
+            places.append(None); continue
+        data, idx = decks[key]
+        places.append(_resolve_card(data["cards"], idx, ref))
+
+    pairs = list(dict.fromkeys((ans, decks[key][0]["cards"][i]["tr"])
+                               for (key, _, ans), i in zip(rows, places) if i is not None))
+    graded = _grade_pairs(pairs)
+
+    summary = {key: {"graded": 0, "correct": 0, "unknown": 0} for key in decks}
+    summary.update((key, {"graded": 0, "correct": 0, "unknown": 0, "no_deck": True}) for key in missing)
+    recs = {key: {} for key in decks}   # öğrenci -> kart sırası -> son review kaydı
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["learner", "card", "answer", "result", "expected", "box", "next"])
+        for (key, ref, ans), i in zip(rows, places):
+            s = summary[key]
+            if i is None:
+                s["unknown"] += 1
+                result = "unknown_learner" if key in missing else "unknown"
+                w.writerow([key, ref, ans, result, "", "", ""]); continue
+            card = decks[key][0]["cards"][i]
+            ok = graded[(ans, card["tr"])] if ans.strip() else False
+            schedule(card, ok)
+            s["graded"] += 1; s["correct"] += int(ok)
+            recs[key][i] = {"op": "review", "i": i, "box": card["box"], "next": card["next"],
+                            "stats": dict(card["stats"])}
+            w.writerow([key, ref, ans, "correct" if ok else "wrong", card["tr"], card["box"], card["next"]])
+    for key, (data, _) in decks.items():
+        if recs[key]:
+            _commit_bulk(data, list(recs[key].values()))
+    return summary
+
+def grade_cli(argv: list):
+    if not argv:
+        print("Kullanım: --grade cevaplar.csv [sonuclar.csv]"); return
+    src = argv[0]
+    out = argv[1] if len(argv) > 1 else os.path.splitext(src)[0] + "_graded.csv"
+    t = time.perf_counter()
+    summary = grade_batch(src, out)
+    for key, s in sorted(summary.items()):
+        if s.get("no_deck"):
+            print(f"{key:<20} bilinmeyen öğrenci (destesi yok), {s['unknown']} satır atlandı"); continue
+        pct = 100 * s["correct"] / s["graded"] if s["graded"] else 0.0
+        print(f"{key:<20} {s['correct']}/{s['graded']} doğru ({pct:.1f}%)"
+              + (f", {s['unknown']} bilinmeyen kart" if s["unknown"] else ""))
+    print(f"✓ {sum(s['graded'] + s['unknown'] for s in summary.values())} satır "
+          f"{time.perf_counter() - t:.2f} sn'de notlandırıldı → {out}")
 
 # ---------- Main ----------
 def main():
     print("="*74)
     print(" İngilizce Çalışma — Quiz + SRS + Ses + Çeviri + Konuşma (B1) ")
     print("="*74)
+    warm_backends()
 
     username = input("Lütfen adınızı yazın: ").strip() or "guest"
     if username.lower() == "sude":
@@ -609,6 +3681,11 @@ def main():
         print("4) İstatistikleri göster")
         print("5) B1 Karşılıklı Konuşma (Sesli)")
         print("6) İlerlemeyi sıfırla")
+        print("7) Toplu içe aktar (CSV/TSV/Anki)")
+        print("8) Desteyi dışa aktar")
+        print("9) Gecikme istatistikleri (ses/çeviri)")
+        print("10) Kelime ara")
+        print("11) Tekrar tahmini (30 gün)")
         print("0) Çıkış")
         ch = input("Seçimin: ").strip()
         if ch == "1": study_text(data)
@@ -617,13 +3694,24 @@ def main():
         elif ch == "4": show_stats(data)
         elif ch == "5": conversation_b1(username)
         elif ch == "6": reset_progress(data)
+        elif ch == "7": import_menu(data)
+        elif ch == "8": export_menu(data)
+        elif ch == "9": show_latency()
+        elif ch == "10": search_menu(data)
+        elif ch == "11": show_forecast(data)
         elif ch == "0":
-            print("Görüşürüz!"); break
+            print("Görüşürüz!"); SPEECH.wait_idle(timeout=10); break
         else:
             print("Geçersiz seçim.")
 
 if __name__ == "__main__":
     try:
-        main()
+        if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+            asyncio.run(serve(SERVER_HOST, int(sys.argv[2]) if len(sys.argv) > 2 else SERVER_PORT))
+        elif len(sys.argv) > 1 and sys.argv[1] == "--grade":
+            grade_cli(sys.argv[2:])
+        else:
+            main()
     except KeyboardInterrupt:
+        flush_users()
         print("\nÇıkılıyor...")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SRS çekirdeği için mikro kıyaslamalar (benchmark).
+
+B1_DEFAULTS benzeri kartlardan 1k / 10k / 100k / 1M kartlık sentetik desteler
+kurar; load_data, save_data, due_cards, due kuyruğu, tekrar tahmini, schedule,
+matches, normalize, MCQ çeldirici seçimi ve show_stats için çağrı başına süre ile tepe bellek
+kullanımını ölçer ve sonuçları JSON olarak kaydeder.
+
+    python bench_srs.py                          # tüm boyutlar
+    python bench_srs.py --sizes 1000,10000 --out yeni.json --compare eski.json
+"""
+
+from __future__ import annotations
+import argparse, contextlib, io, json, os, platform, random, statistics, sys, tempfile, time
+import tracemalloc
+from datetime import date, timedelta, datetime
+
+import askkusum_ıle_ıngılızce as app
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CALLS = 2_000        # çağrı başına ölçülen işlemler için tekrar sayısı
+
+def synthetic_deck(n: int, seed: int = 42) -> dict:
+    rnd = random.Random(seed)
+    today = date.today()
+    base = app.B1_DEFAULTS
+    cards = []
+    for i in range(n):
+        en, tr = base[i % len(base)]
+        box = rnd.randrange(len(app.INTERVALS))
+        nxt = (today + timedelta(days=rnd.randint(-5, app.INTERVALS[box]))).isoformat()
+        cards.append({"en": f"{en} {i}", "tr": f"{tr} {i}", "box": box, "next": nxt,
+                      "stats": {"correct": rnd.randint(0, 20), "wrong": rnd.randint(0, 10)}})
+    return {"cards": cards}
+
+def _typo(s: str, rnd: random.Random) -> str:
+    if len(s) < 3:
+        return s
+    i = rnd.randrange(len(s))
+    return s[:i] + s[i + 1:]
+
+def measure(fn, calls: int = 1, repeat: int = 3, memory: bool = True) -> dict:
+    """fn'i repeat kez çalıştırır; en iyi süreyi çağrı sayısına böler."""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    res = {"per_call_s": min(times) / calls, "median_s": statistics.median(times), "calls": calls}
+    if memory:
+        tracemalloc.start()
+        fn()
+        res["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return res
+
+def bench_size(n: int, workdir: str, memory: bool) -> dict:
+    rnd = random.Random(n)
+    data = synthetic_deck(n)
+    cards = data["cards"]
+    path = os.path.join(workdir, f"deck_{n}.json")
+    app.DATA_FILE = path
+    app.save_data(data)
+    app.unload_data(data)
+    repeat = 1 if n >= 1_000_000 else 3
+    picks = [cards[rnd.randrange(n)] for _ in range(CALLS)]
+    answers = [(_typo(c["tr"].split(";")[0], rnd), c["tr"]) for c in picks]
+    out = {}
+
+    def load():
+        app.unload_data(app.load_data(path))
+    out["load_data"] = measure(load, repeat=repeat, memory=memory)
+
+    loaded = app.load_data(path)
+    out["save_data"] = measure(lambda: app.save_data(loaded), repeat=repeat, memory=memory)
+    app.unload_data(loaded)
+
+    out["due_cards"] = measure(lambda: app.due_cards(cards), repeat=repeat, memory=memory)
+
+    def sched():
+        for i, c in enumerate(picks):
+            app.schedule(c, i % 3 != 0)
+    out["schedule"] = measure(sched, calls=CALLS, memory=memory)
+
+    def norm():
+        for u, _ in answers:
+            app.normalize(u)
+    out["normalize"] = measure(norm, calls=CALLS, memory=memory)
+
+    def match():
+        for u, a in answers:
+            app.matches(u, a)
+    out["matches"] = measure(match, calls=CALLS, memory=memory)
+
+    def build_index():
+        app._distractor_indexes.pop(id(cards), None)
+        app.distractor_index(cards)
+    out["distractor_index_build"] = measure(build_index, repeat=repeat, memory=memory)
+
+    def distract():
+        for c in picks:
+            app.pick_distractors(cards, c, "tr", 3)
+    out["ask_mcq_distractors"] = measure(distract, calls=CALLS, memory=memory)
+
+    loaded = app.load_data(path)   # artımlı istatistikler ve due kuyruğu yüklü destede tutulur
+    app.due_queue(loaded)
+    out["due_queue_cap20"] = measure(lambda: app.due_queue(loaded).due(cap=20), repeat=repeat, memory=memory)
+    out["review_forecast"] = measure(lambda: app.review_forecast(loaded["cards"]), repeat=repeat, memory=memory)
+    def stats():
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.show_stats(loaded)
+    out["show_stats"] = measure(stats, repeat=repeat, memory=memory)
+    app.unload_data(loaded)
+    return out
+
+def _fmt_time(s: float) -> str:
+    if s < 1e-3:
+        return f"{s * 1e6:9.1f} µs"
+    if s < 1:
+        return f"{s * 1e3:9.2f} ms"
+    return f"{s:9.2f} s "
+
+def print_report(results: dict, baseline: dict = None):
+    for size, ops in results["sizes"].items():
+        print(f"\n--- {int(size):,} kart ---")
+        for op, r in ops.items():
+            line = f"{op:<24}{_fmt_time(r['per_call_s'])}"
+            if "peak_bytes" in r:
+                line += f"   tepe {r['peak_bytes'] / 1024:12,.0f} KiB"
+            old = (baseline or {}).get("sizes", {}).get(size, {}).get(op)
+            if old:
+                line += f"   önceki/yeni: {old['per_call_s'] / max(r['per_call_s'], 1e-12):5.2f}x"
+            print(line)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                    help="virgülle ayrılmış deste boyutları")
+    ap.add_argument("--out", default="bench_results.json", help="sonuç dosyası")
+    ap.add_argument("--compare", help="karşılaştırılacak önceki sonuç dosyası")
+    ap.add_argument("--no-memory", action="store_true", help="tracemalloc ölçümünü atla")
+    args = ap.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    results = {"created": datetime.now().isoformat(timespec="seconds"),
+               "python": sys.version.split()[0], "platform": platform.platform(),
+               "storage": app.STORAGE, "sizes": {}}
+    with tempfile.TemporaryDirectory(prefix="srs-bench-") as workdir:
+        for n in sizes:
+            print(f"{n:,} kart ölçülüyor...", file=sys.stderr)
+            results["sizes"][str(n)] = bench_size(n, workdir, memory=not args.no_memory)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nSonuçlar kaydedildi: {args.out}")
+
+if __name__ == "__main__":
+    main()
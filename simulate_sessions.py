@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Uçtan uca oturum simülatörü (başsız / headless).
+
+study_text, study_voice ve conversation_b1 akışlarını gerçek kodla çalıştırır;
+yalnızca input()/print(), listen(), TTS (_speak_now) ve çeviri ağı
+(_translate_remote) yerel yedeklerle değiştirilir. Yedeklere yapay gecikme
+verilebilir. Simüle öğrenciler ekranda basılan soruyu/seçenekleri okuyup
+destedeki doğru cevabı verilen olasılıkla bilir. Oturum/saniye, tur başına
+gecikme (p50/p95) ve dosya G/Ç hacmi raporlanır.
+
+    python simulate_sessions.py --learners 1000 --flows text,voice,conversation
+    python simulate_sessions.py --learners 200 --tts-ms 300 --stt-ms 800 --translate-ms 150 --workers 8
+"""
+
+from __future__ import annotations
+import argparse, json, os, random, re, statistics, sys, tempfile, threading, time
+from datetime import datetime
+
+import askkusum_ıle_ıngılızce as app
+
+FLOWS = ("text", "voice", "conversation")
+_WORDS = ("i", "usually", "try", "to", "improve", "my", "english", "every", "day", "because", "it",
+          "helps", "me", "at", "work", "and", "travel", "we", "often", "discuss", "new", "ideas",
+          "with", "friends", "although", "sometimes", "avoid", "stress", "by", "walking")
+_option_re = re.compile(r"^\s+(\d+)\) (.*)$")
+_question_re = re.compile(r"\((EN→TR|TR→EN)\)\s+Soru: (.*)$")
+_NUM_WORDS = {1: "bir", 2: "iki", 3: "üç", 4: "dört"}
+
+class Learner:
+    """Ekran çıktısını izleyip istemlere cevap veren simüle öğrenci."""
+    def __init__(self, name: str, rnd: random.Random, p_correct: float, turns: int, stt_s: float):
+        self.name = name
+        self.rnd = rnd
+        self.p_correct = p_correct
+        self.turns = turns
+        self.stt_s = stt_s
+        self.menu_picks = 0
+        self.cards = None        # çalışılan deste
+        self.question = None     # (yön, metin)
+        self.options = []
+        self.conversation = False
+        self.said = 0
+        self.last_answer = None  # tur gecikmesi için: son cevabın verildiği an
+        self.turn_latency = []
+
+    # --- ekran ---
+    def print(self, *args, **kwargs):
+        line = " ".join(str(a) for a in args)
+        for part in line.splitlines():
+            m = _question_re.search(part)
+            if m:
+                self.question = (m.group(1), m.group(2)); self.options = []
+                continue
+            m = _option_re.match(part)
+            if m:
+                self.options.append(m.group(2))
+
+    # --- cevaplar ---
+    def _mark_prompt(self):
+        if self.last_answer is not None:
+            self.turn_latency.append(time.perf_counter() - self.last_answer)
+
+    def _answered(self, text: str) -> str:
+        self.last_answer = time.perf_counter()
+        return text
+
+    def _correct(self) -> str:
+        direction, q = self.question
+        cards = self.cards if self.cards is not None else app.load_data()["cards"]
+        side, other = ("en", "tr") if direction == "EN→TR" else ("tr", "en")
+        hit = app.lookup_index(cards).keys[side].get(app.normalize(q))
+        if not hit:
+            return ""
+        return cards[hit[0]][other]
+
+    def _typed(self) -> str:
+        r = self.rnd.random()
+        if self.question is None or r > 0.97:
+            return ""
+        correct = self._correct()
+        alt = self.rnd.choice(app._variant_re.split(correct)).strip() if correct else ""
+        if r < self.p_correct:
+            if alt and len(alt) > 4 and self.rnd.random() < 0.2:   # küçük yazım hatası
+                i = self.rnd.randrange(len(alt))
+                alt = alt[:i] + alt[i + 1:]
+            return alt
+        return self.rnd.choice(_WORDS)
+
+    def _choice(self) -> int:
+        if not self.options:
+            return 1
+        correct = self._correct()
+        right = [i for i, o in enumerate(self.options, 1) if correct and app.matches(o, correct)]
+        if right and self.rnd.random() < self.p_correct:
+            return right[0]
+        return self.rnd.randint(1, len(self.options))
+
+    def _sentence(self) -> str:
+        self.said += 1
+        if self.said > self.turns:
+            return "quit"
+        r = self.rnd.random()
+        if r < 0.05:
+            return "istatistikleri göster"
+        if r < 0.10:
+            return "çevir " + self.rnd.choice(app.B1_DEFAULTS)[self.rnd.random() < 0.5]
+        n = self.rnd.randint(3, 25)
+        return " ".join(self.rnd.choice(_WORDS) for _ in range(n))
+
+    def input(self, prompt: str = "") -> str:
+        self._mark_prompt()
+        if prompt.startswith("Seçim: "):
+            self.menu_picks += 1
+            return self._answered(str(self.rnd.randint(1, 3 if self.menu_picks == 1 else 2)))
+        if prompt.startswith("Sorular Türkçe"):
+            return self._answered(self.rnd.choice("eh"))
+        if prompt.startswith("Cevap ("):
+            return self._answered(self._typed())
+        if prompt.startswith("Seçimin"):
+            return self._answered(str(self._choice()))
+        if prompt.startswith("Cevabınız"):
+            return self._answered(self._sentence())
+        return self._answered("n")
+
+    def listen(self, lang: str = "en-US", timeout: float = 6.0, phrase_time_limit: float = 45.0):
+        app.SPEECH.wait_idle()   # soru okunup bitene kadar tur sürer
+        self._mark_prompt()
+        if self.stt_s:
+            time.sleep(self.stt_s)
+        if self.conversation:
+            return self._answered(self._sentence())
+        if self.options:
+            return self._answered(_NUM_WORDS.get(self._choice(), "bir"))
+        return self._answered(self._typed() or None) if self.rnd.random() > 0.1 else None
+
+_current = threading.local()
+
+def _learner() -> Learner:
+    return _current.learner
+
+class WorkerSpeech:
+    """app.SPEECH yerine: her simülasyon thread'inin kendi konuşma kuyruğu olur;
+    bir öğrencinin wait_idle()/interrupt() çağrısı diğerlerinin sesini beklemez/kesmez."""
+    def __getattr__(self, name):
+        q = getattr(_current, "speech", None)
+        if q is None:
+            q = _current.speech = app.SpeechQueue()
+        return getattr(q, name)
+
+def install_stand_ins(tts_s: float, translate_s: float):
+    """Uygulamanın G/Ç uçlarını yerel yedeklerle değiştirir."""
+    app.print = lambda *a, **k: _learner().print(*a, **k)
+    app.input = lambda prompt="": _learner().input(prompt)
+    app.listen = lambda *a, **k: _learner().listen(*a, **k)
+    app.SPEECH = WorkerSpeech()
+    app._ensure_stt = lambda: False          # mikrofon açılmaz
+    app._uses_edge_now = lambda lang: False   # pyttsx3/Edge kurulmaz
+    app.warm_backends = lambda: None
+    app.LATENCY_FILE = None
+
+    def speak_now(text, lang="en"):
+        if tts_s:
+            time.sleep(tts_s * min(3.0, max(0.3, len(text) / 40)))
+        return True
+    app._speak_now = speak_now
+
+    def translate_remote(texts, dest):
+        if translate_s:
+            time.sleep(translate_s)
+        return [f"[{dest}] {t}" for t in texts]
+    app._translate_remote = translate_remote
+
+def io_counters() -> dict:
+    """Linux'ta /proc/self/io; diğer sistemlerde boş sözlük."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except OSError:
+        return {}
+
+def run_session(learner: Learner, flow: str):
+    _current.learner = learner
+    learner.menu_picks = 0; learner.question = None; learner.options = []
+    learner.conversation = flow == "conversation"; learner.said = 0; learner.last_answer = None
+    if flow == "conversation":
+        app.conversation_b1(learner.name)
+        return
+    data = app.load_data(app.learner_deck_path(app.learner_key(learner.name)))
+    learner.cards = data["cards"]
+    (app.study_text if flow == "text" else app.study_voice)(data)
+
+def simulate(args) -> dict:
+    install_stand_ins(args.tts_ms / 1000, args.translate_ms / 1000)
+    flows = [f for f in args.flows.split(",") if f]
+    rnd = random.Random(args.seed)
+    learners = [Learner(f"learner{i}", random.Random(rnd.random()), args.p_correct, args.turns,
+                        args.stt_ms / 1000) for i in range(args.learners)]
+    jobs = [(ln, flows[(i + k) % len(flows)]) for i, ln in enumerate(learners)
+            for k in range(args.sessions)]
+    per_flow = {f: [] for f in flows}
+    lock = threading.Lock()
+
+    def worker(chunk):
+        for ln, flow in chunk:
+            t = time.perf_counter()
+            run_session(ln, flow)
+            with lock:
+                per_flow[flow].append(time.perf_counter() - t)
+
+    io0, t0 = io_counters(), time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(jobs[w::args.workers],)) for w in range(args.workers)]
+    for th in threads: th.start()
+    for th in threads: th.join()
+    app.flush_users()
+    app.close_data()
+    elapsed = time.perf_counter() - t0
+    io1 = io_counters()
+
+    turns = sorted(x for ln in learners for x in ln.turn_latency)
+    pct = lambda xs, p: round(xs[min(len(xs) - 1, int(p * len(xs)))] * 1000, 2) if xs else None
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0], "storage": app.STORAGE,
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "sessions": len(jobs), "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(len(jobs) / elapsed, 2) if elapsed else None,
+        "turns": len(turns), "turn_p50_ms": pct(turns, 0.50), "turn_p95_ms": pct(turns, 0.95),
+        "turn_max_ms": round(turns[-1] * 1000, 2) if turns else None,
+        "session_mean_ms": {f: round(statistics.mean(xs) * 1000, 2) for f, xs in per_flow.items() if xs},
+        "io": {k: io1[k] - io0.get(k, 0) for k in ("rchar", "wchar", "syscr", "syscw", "write_bytes")
+               if k in io1},
+        "stages": app.LATENCY.summary()["stages"],
+    }
+
+def print_report(r: dict):
+    print(f"{r['sessions']} oturum, {r['elapsed_s']} sn  →  {r['sessions_per_s']} oturum/sn")
+    print(f"Tur gecikmesi: n={r['turns']}  p50={r['turn_p50_ms']} ms  p95={r['turn_p95_ms']} ms  "
+          f"maks={r['turn_max_ms']} ms")
+    for f, ms in r["session_mean_ms"].items():
+        print(f"  {f:<13} ort. {ms:10.2f} ms/oturum")
+    if r["io"]:
+        per = max(1, r["sessions"])
+        print(f"Dosya G/Ç: yazılan {r['io']['wchar'] / 1024:,.0f} KiB ({r['io']['wchar'] / per / 1024:,.1f} KiB/oturum, "
+              f"{r['io']['syscw']} write çağrısı), okunan {r['io']['rchar'] / 1024:,.0f} KiB")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--learners", type=int, default=100)
+    ap.add_argument("--sessions", type=int, default=1, help="öğrenci başına oturum")
+    ap.add_argument("--flows", default=",".join(FLOWS), help="text,voice,conversation")
+    ap.add_argument("--turns", type=int, default=10, help="konuşma oturumu başına yanıt")
+    ap.add_argument("--p-correct", type=float, default=0.7)
+    ap.add_argument("--tts-ms", type=float, default=0.0, help="yapay TTS gecikmesi (~40 karakter başına)")
+    ap.add_argument("--stt-ms", type=float, default=0.0, help="yapay tanıma gecikmesi")
+    ap.add_argument("--translate-ms", type=float, default=0.0, help="yapay çeviri isteği gecikmesi")
+    ap.add_argument("--workers", type=int, default=1, help="eşzamanlı öğrenci thread'i")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workdir", help="deste/kullanıcı dosyaları için dizin (varsayılan: geçici)")
+    ap.add_argument("--out", default="sim_results.json", help="sonuç dosyası")
+    args = ap.parse_args(argv)
+    unknown = set(args.flows.split(",")) - set(FLOWS) - {""}
+    if unknown:
+        ap.error(f"bilinmeyen akış: {', '.join(sorted(unknown))}")
+    args.workers = max(1, args.workers)
+    out = os.path.abspath(args.out)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="srs-sim-") as tmp:
+        os.chdir(args.workdir or tmp)   # tüm göreli veri yolları buraya yazılır
+        try:
+            results = simulate(args)
+        finally:
+            os.chdir(cwd)
+    print_report(results)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar kaydedildi: {out}")
+
+if __name__ == "__main__":
+    main()